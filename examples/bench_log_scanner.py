@@ -0,0 +1,58 @@
+"""
+Rows/s and peak RSS of reading timestamp (as datetime64) and costs (as float64) from the big log:
+log_scanner.scan versus pd.read_csv(chunksize=...). Every method runs in a fresh process.
+
+Usage: python bench_log_scanner.py [path]
+"""
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from big_file import target
+from log_scanner import scan
+
+CHUNK_ROWS = 1_000_000
+
+
+def read_pandas(path):
+    rows = 0
+    total = 0.0
+    for df in pd.read_csv(path, usecols=["timestamp", "costs"], chunksize=CHUNK_ROWS):
+        df = df[df["costs"].notna()]
+        timestamps = pd.to_datetime(df["timestamp"], format="%Y-%m-%d %H:%M:%S").to_numpy()
+        rows += len(timestamps)
+        total += float(df["costs"].sum())
+    return rows, total
+
+
+def read_scanner(path):
+    rows = 0
+    total = 0.0
+    for chunk in scan(path, columns=("timestamp", "costs")):
+        rows += len(chunk["costs"])
+        total += float(np.nansum(chunk["costs"]))
+    return rows, total
+
+
+def run(method, path):
+    start = time.perf_counter()
+    rows, total = method(path)
+    elapsed = time.perf_counter() - start
+    return rows, total, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(path=target):
+    context = multiprocessing.get_context("spawn")
+    print(f"{'method':28s} {'rows':>10s} {'rows/s':>12s} {'peak RSS [MB]':>14s}  sum of costs")
+    for name, method in [("pd.read_csv(chunksize=1M)", read_pandas), ("log_scanner.scan", read_scanner)]:
+        with context.Pool(1) as pool:
+            rows, total, elapsed, rss = pool.apply(run, (method, path))
+        print(f"{name:28s} {rows:10d} {rows / elapsed:12.0f} {rss:14.1f}  {total:.2f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,73 @@
+"""
+Time and peak RSS of the splitting utilities, every case in a fresh process:
+- split_indices / stratified_split_indices / hash_split over n indices (default 100M)
+- split_file of the big log into train and test files (one streaming pass)
+
+Usage: python bench_splitting.py [n] [path]
+"""
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from big_file import target
+from splitting import hash_split, split_file, split_indices, stratified_split_indices
+
+N = 100_000_000
+
+
+def indices(n):
+    train, test = split_indices(n, (0.8, 0.2))
+    return f"{len(train)} / {len(test)} {train.dtype}"
+
+
+def stratified(n):
+    labels = (np.arange(n, dtype=np.int32) % 7).astype(np.int8)
+    train, test = stratified_split_indices(labels, (0.8, 0.2))
+    return f"{len(train)} / {len(test)} {train.dtype}"
+
+
+def hashed(n, block=10_000_000):
+    counts = np.zeros(2, dtype=np.int64)
+    for start in range(0, n, block):
+        counts += np.bincount(hash_split(np.arange(start, min(start + block, n)), (0.8, 0.2)), minlength=2)
+    return f"{counts[0]} / {counts[1]}"
+
+
+def log_file(path):
+    with tempfile.TemporaryDirectory() as directory:
+        outputs = [Path(directory) / "train.csv", Path(directory) / "test.csv"]
+        train, test = split_file(path, outputs, (0.8, 0.2))
+    return f"{train} / {test} lines"
+
+
+def run(function, argument):
+    start = time.perf_counter()
+    result = function(argument)
+    elapsed = time.perf_counter() - start
+    return result, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(n=N, path=target):
+    n = int(n)
+    size = Path(path).stat().st_size if Path(path).exists() else 0
+    cases = [(f"split_indices({n})", indices, n), (f"stratified_split_indices({n})", stratified, n),
+             (f"hash_split({n})", hashed, n)]
+    if size:
+        cases.append((f"split_file({size / 2 ** 20:.0f} MB)", log_file, path))
+    else:
+        print(f"{path} not found, generate it with big_file.py")
+    context = multiprocessing.get_context("spawn")
+    print(f"{'case':36s} {'time [s]':>9s} {'peak RSS [MB]':>14s}  result")
+    for name, function, argument in cases:
+        with context.Pool(1) as pool:
+            result, elapsed, rss = pool.apply(run, (function, argument))
+        print(f"{name:36s} {elapsed:9.2f} {rss:14.1f}  {result}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -1,10 +1,29 @@
+"""
+Synthetic big log, downloaded_log.csv with columns timestamp,label,code,costs.
+
+create_big_log() is the original slow writer (one f.write per row, then the whole file read back
+into memory and written 100 times). generate_log() writes the same columns from NumPy-vectorized
+chunks with flat memory, up to a target number of rows or bytes, optionally into shards written by
+a process pool. Both end every file with the malformed "timestamp,mean cost" summary line.
+
+Usage:
+    python big_file.py                          # original create_big_log()
+    python big_file.py --size 2G [--shards 4]   # generate_log(), or --rows 10000000
+"""
+import argparse
+import logging
+import os
 import random
 import random as download
 import time
 from datetime import timedelta as _t_
 from datetime import datetime as d
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
 
 target = Path(__file__).parent / 'downloaded_log.csv'
 
@@ -39,7 +58,137 @@ def create_big_log():
             for _ in f(100):
                 _fn.write(f'{a}\n')
 
+HEADER = b"timestamp,label,code,costs\n"
+LABEL = b",mydummytext,"
+ROW_WIDTH = 19 + len(LABEL) + 4 + 8  # timestamp, label, "ddd,", right-aligned "dddd.dd\n"
+CHUNK_ROWS = 100_000
+WRITE_BUFFER = 4 * 1024 * 1024
+SIZE_UNITS = {"": 1, "K": 2 ** 10, "M": 2 ** 20, "G": 2 ** 30, "T": 2 ** 40}
+
+
+def parse_size(size: str) -> int:
+    """Bytes of a size like 500M or 2G."""
+    size = size.strip().upper().removesuffix("B")
+    unit = size[-1] if size[-1:] in SIZE_UNITS else ""
+    return int(float(size[:len(size) - len(unit)]) * SIZE_UNITS[unit])
+
+
+def _timestamps(now: datetime) -> np.ndarray:
+    """(2001, 19) bytes of now +- 1000 hours as "%Y-%m-%d %H:%M:%S"."""
+    hours = np.datetime64(now.replace(microsecond=0), "s") + np.arange(-1000, 1001) * np.timedelta64(1, "h")
+    text = np.datetime_as_string(hours, unit="s").astype("S19")
+    table = np.frombuffer(text.tobytes(), dtype=np.uint8).reshape(-1, 19).copy()
+    table[:, 10] = ord(" ")
+    return table
+
+
+def _format_rows(timestamps: np.ndarray, hours: np.ndarray, codes: np.ndarray, cents: np.ndarray) -> tuple:
+    """
+    CSV rows as a fixed width byte matrix (one row per line) and a mask of the bytes to keep:
+    costs are right-aligned, their leading padding is dropped when the rows are flattened.
+    """
+    n = len(cents)
+    rows = np.empty((n, ROW_WIDTH), dtype=np.uint8)
+    rows[:, :19] = timestamps[hours + 1000]
+    rows[:, 19:19 + len(LABEL)] = np.frombuffer(LABEL, dtype=np.uint8)
+    pos = 19 + len(LABEL)
+    for i, divisor in enumerate((100, 10, 1)):
+        rows[:, pos + i] = ord("0") + codes // divisor % 10
+    rows[:, pos + 3] = ord(",")
+    pos += 4
+    integer = cents // 100
+    for i, divisor in enumerate((1000, 100, 10, 1)):
+        rows[:, pos + i] = ord("0") + integer // divisor % 10
+    rows[:, pos + 4] = ord(".")
+    rows[:, pos + 5] = ord("0") + cents // 10 % 10
+    rows[:, pos + 6] = ord("0") + cents % 10
+    rows[:, pos + 7] = ord("\n")
+    keep = np.ones((n, ROW_WIDTH), dtype=bool)
+    for i, limit in enumerate((1000, 100, 10)):
+        keep[:, pos + i] = integer >= limit
+    return rows, keep
+
+
+def _write_log(path: Path, rows: int = None, size: int = None, seed: int = None,
+               chunk_rows: int = CHUNK_ROWS) -> tuple[int, int]:
+    """Writes one log file of `rows` rows or about `size` bytes. Returns (rows, bytes) written."""
+    rng = np.random.default_rng(seed)
+    n_rows = n_bytes = 0
+    total_cents = 0
+    last = ""
+    with open(path, "wb", buffering=WRITE_BUFFER) as f:
+        n_bytes += f.write(HEADER)
+        while (rows is None or n_rows < rows) and (size is None or n_bytes < size):
+            n = chunk_rows if rows is None else min(chunk_rows, rows - n_rows)
+            cents = rng.integers(1_000, 100_001, size=n)
+            chunk, keep = _format_rows(_timestamps(datetime.now()), rng.integers(-1000, 1001, size=n),
+                                       rng.integers(100, 1000, size=n), cents)
+            if size is not None:
+                # Last chunk: only the rows that fit into the byte budget
+                fits = np.cumsum(keep.sum(axis=1)) <= size - n_bytes
+                n = max(1, int(fits.sum()))
+                chunk, keep, cents = chunk[:n], keep[:n], cents[:n]
+            n_bytes += f.write(chunk[keep].tobytes())
+            n_rows += n
+            total_cents += int(cents.sum())
+            last = chunk[-1, :19].tobytes().decode()
+        n_bytes += f.write(f"{last},{total_cents / 100 / max(n_rows, 1):0.2f}".encode())
+    return n_rows, n_bytes
+
+
+def shard_paths(path: Path, shards: int) -> list[Path]:
+    if shards == 1:
+        return [Path(path)]
+    return [Path(path).with_suffix(f".{i:03d}{Path(path).suffix}") for i in range(shards)]
+
+
+def generate_log(path: Path = target, rows: int = None, size: int = None, shards: int = 1,
+                 processes: int = None, seed: int = 0) -> tuple[int, int]:
+    """
+    Generates the log in vectorized chunks, memory stays flat at a few chunks per process.
+    Args:
+        path: Output file, shards are named <stem>.000<suffix>, <stem>.001<suffix>, ...
+        rows: Target number of rows (all shards together).
+        size: Target size in bytes (all shards together), used when rows is None.
+        shards: Number of files, written in parallel by a process pool.
+        processes: Pool size, defaults to min(shards, CPU count).
+        seed: Seed of the random values, every shard gets an independent stream.
+    Returns:
+        Rows and bytes written.
+    """
+    if rows is None and size is None:
+        raise ValueError("Give a target number of rows or a target size")
+    paths = shard_paths(path, shards)
+    seeds = np.random.SeedSequence(seed).spawn(shards)
+    rows_per_shard = [None] * shards if rows is None else [rows // shards + (i < rows % shards) for i in range(shards)]
+    size_per_shard = [None if size is None else size // shards] * shards
+    if shards == 1:
+        return _write_log(paths[0], rows_per_shard[0], size_per_shard[0], seeds[0])
+    with ProcessPoolExecutor(max_workers=processes or min(shards, os.cpu_count())) as pool:
+        results = list(pool.map(_write_log, paths, rows_per_shard, size_per_shard, seeds))
+    return sum(r for r, _ in results), sum(b for _, b in results)
+
+
+def main():
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Synthetic timestamp,label,code,costs log.")
+    parser.add_argument("--rows", type=int, help="Target number of rows")
+    parser.add_argument("--size", type=parse_size, help="Target size, e.g. 500M or 2G")
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=target)
+    args = parser.parse_args()
+    if args.rows is None and args.size is None:
+        create_big_log()
+        return
+
+    start = time.perf_counter()
+    n_rows, n_bytes = generate_log(args.output, args.rows, args.size, args.shards, args.processes, args.seed)
+    elapsed = time.perf_counter() - start
+    logging.info("Wrote %d rows, %.1f MB in %.2f s: %.1f MB/s", n_rows, n_bytes / 2 ** 20, elapsed,
+                 n_bytes / 2 ** 20 / elapsed)
 
 
 if __name__ == "__main__":
-    create_big_log()
+    main()
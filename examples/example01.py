@@ -1,24 +1,19 @@
-import random
+from splitting import split_indices, take
 
 
 def train_test_split(data):
-    random.shuffle(data)
-    train = data[:len(data) // 2]
-    random.shuffle(data)
-    test = data[len(data) // 2:]
-    return train, test
+    """Halves of data in random order, disjoint, data is not modified."""
+    train, test = split_indices(len(data), (0.5, 0.5))
+    return take(data, train), take(data, test)
 
 
 def trainTestValidationSplit(x):
-    random.seed(158)
-    if not x or len(x) < 3: raise ValueError("")
-    random.shuffle(x)
-    i = len(x) // 3
-    return x[:i], x[i:i+i], x[2*i:]
+    if not x or len(x) < 3:
+        raise ValueError("Need at least 3 records")
+    train, test, validation = split_indices(len(x), (1, 1, 1), seed=158)
+    return take(x, train), take(x, test), take(x, validation)
 
 
-def train_test_split_petr(data : list, ratio: float =0.8)-> tuple[list,list]:
-    train = len(data)* ratio
-    test = len(data) *ratio
-    data = sorted(set(data))
-    return random.sample(data,train),random.sample(data, test)
+def train_test_split_petr(data: list, ratio: float = 0.8) -> tuple[list, list]:
+    train, test = split_indices(len(data), (ratio, 1 - ratio))
+    return take(data, train), take(data, test)
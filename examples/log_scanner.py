@@ -0,0 +1,195 @@
+"""
+Memory-mapped scanner of the big log (downloaded_log.csv from big_file.py).
+
+The file is mapped read-only and processed in chunks of whole lines. Newlines and commas are
+located with NumPy over the raw bytes, and only the requested columns are decoded, straight from
+the mapped buffer into NumPy arrays, without creating a Python string per line:
+    costs       float64, "[-]digits[.digits]" decoded as an integer mantissa / 10 ** decimals
+                (exact like strtod), other spellings (exponents, ...) fall back to float()
+    timestamp   datetime64[s] from "YYYY-MM-DD HH:MM:SS", NaT when the field has another shape
+Lines that do not have 4 fields (the "timestamp,mean" summary lines) are skipped and counted.
+Pages of finished chunks are released, so the resident memory stays at about one chunk.
+
+Usage: python log_scanner.py [path]
+"""
+import mmap
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from big_file import target
+
+COLUMNS = ["timestamp", "label", "code", "costs"]
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_NUMBER_WIDTH = 18  # digits of an exact int64 mantissa
+TIMESTAMP_WIDTH = 19
+
+
+def _gather(buf: np.ndarray, starts: np.ndarray, width: int) -> np.ndarray:
+    """(n, width) bytes starting at every start, positions past the buffer read as 0."""
+    if len(buf) < width:
+        buf = np.concatenate([buf, np.zeros(width - len(buf), dtype=np.uint8)])
+    last = len(buf) - width
+    chars = sliding_window_view(buf, width)[np.minimum(starts, last)]
+    for i in np.flatnonzero(starts > last):  # the last lines of the buffer
+        tail = buf[starts[i]:]
+        chars[i] = np.concatenate([tail, np.zeros(width - len(tail), dtype=np.uint8)])
+    return chars
+
+
+def parse_decimals(buf: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Decimal numbers in buf[starts[i]:ends[i]] as float64."""
+    lengths = ends - starts
+    if not len(starts):
+        return np.empty(0, dtype=np.float64)
+    width = int(min(lengths.max(), MAX_NUMBER_WIDTH + 2))
+    chars = _gather(buf, starts, width)
+    negative = chars[:, 0] == ord("-")
+    # Column by column (short loops over long vectors): mantissa by Horner's scheme, digit and dot counts
+    mantissa = np.zeros(len(starts), dtype=np.int64)
+    n_digits = np.zeros(len(starts), dtype=np.int64)
+    n_dots = np.zeros(len(starts), dtype=np.int64)
+    dot = lengths.copy()
+    for column in range(width):
+        inside = lengths > column
+        digits = chars[:, column] - np.uint8(ord("0"))  # wraps below "0"
+        is_digit = (digits <= 9) & inside
+        is_dot = (chars[:, column] == ord(".")) & inside
+        mantissa = np.where(is_digit, mantissa * 10 + digits, mantissa)
+        n_digits += is_digit
+        n_dots += is_dot
+        dot = np.where(is_dot, column, dot)
+    decimals = np.where(n_dots > 0, lengths - dot - 1, 0)
+    valid = (n_digits + n_dots + negative == lengths) & (n_dots <= 1) & (n_digits > 0) & (lengths <= width)
+
+    values = mantissa / 10.0 ** decimals
+    values = np.where(negative, -values, values)
+
+    for i in np.flatnonzero(~valid):
+        try:
+            values[i] = float(buf[starts[i]:ends[i]].tobytes())
+        except ValueError:
+            values[i] = np.nan
+    return values
+
+
+TIMESTAMP_PARTS = [(0, 4), (5, 7), (8, 10), (11, 13), (14, 16), (17, 19)]  # year, month, ... second
+TIMESTAMP_DIGITS = [i for first, last in TIMESTAMP_PARTS for i in range(first, last)]
+
+
+def parse_timestamps(buf: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """"YYYY-MM-DD HH:MM:SS" in buf[starts[i]:ends[i]] as datetime64[s], NaT for other shapes."""
+    digits = _gather(buf, starts, TIMESTAMP_WIDTH)[:, TIMESTAMP_DIGITS] - np.uint8(ord("0"))  # wraps below "0"
+    valid = ends - starts == TIMESTAMP_WIDTH
+    parts = []
+    column = 0
+    for first, last in TIMESTAMP_PARTS:
+        value = np.zeros(len(starts), dtype=np.int64)
+        for _ in range(last - first):
+            valid &= digits[:, column] <= 9
+            value = value * 10 + digits[:, column]
+            column += 1
+        parts.append(value)
+    year, month, day, hour, minute, second = parts
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    # Days since 1970-01-01 of the proleptic Gregorian date (H. Hinnant's days_from_civil)
+    y = year - (month <= 2)
+    era = np.floor_divide(y, 400)
+    year_of_era = y - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+    seconds = days * 86400 + hour * 3600 + minute * 60 + second
+    return np.where(valid, seconds, np.iinfo(np.int64).min).astype("datetime64[s]")
+
+
+def _field_bounds(buf: np.ndarray):
+    """
+    Start and end of every line with exactly 4 fields, positions of all commas and the index of the
+    first comma of every such line, plus the number of other lines.
+    """
+    newlines = np.flatnonzero(buf == ord("\n"))
+    line_starts = np.concatenate([[0], newlines + 1])
+    line_ends = np.concatenate([newlines, [len(buf)]])
+    keep = line_ends > line_starts
+    line_starts, line_ends = line_starts[keep], line_ends[keep]
+    if len(line_ends) and buf[line_ends[-1] - 1] == ord("\r"):
+        line_ends = line_ends - (buf[line_ends - 1] == ord("\r"))
+    commas = np.flatnonzero(buf == ord(","))
+    first_comma = np.searchsorted(commas, line_starts)
+    n_commas = np.searchsorted(commas, line_ends) - first_comma
+    valid = n_commas == len(COLUMNS) - 1
+    first_comma = first_comma[valid]
+    return line_starts[valid], line_ends[valid], commas, first_comma, int((~valid).sum())
+
+
+def _field(column: int, line_starts, line_ends, commas, first_comma):
+    """Start and end offsets of one column in every line."""
+    starts = line_starts if column == 0 else commas[first_comma + column - 1] + 1
+    ends = line_ends if column == len(COLUMNS) - 1 else commas[first_comma + column]
+    return starts, ends
+
+
+def scan(path: Path = target, columns=("costs",), chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yields {column: array, "malformed": count} per chunk of whole lines.
+    Supported columns: timestamp (datetime64[s]), costs (float64), label and code (bytes, S dtype).
+    """
+    with open(path, "rb") as f:
+        size = Path(path).stat().st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = np.frombuffer(mm, dtype=np.uint8)
+            buf = None
+            try:
+                header = mm[:len(COLUMNS[0])] == COLUMNS[0].encode()
+                start = data[:64].tobytes().find(b"\n") + 1 if header else 0
+                released = 0
+                while start < size:
+                    end = min(start + chunk_size, size)
+                    if end < size:
+                        end = mm.rfind(b"\n", start, end) + 1 or mm.find(b"\n", end) + 1 or size
+                    buf = data[start:end]
+                    *bounds, malformed = _field_bounds(buf)
+                    result = {"malformed": malformed}
+                    for column in columns:
+                        starts, ends = _field(COLUMNS.index(column), *bounds)
+                        if column == "costs":
+                            result[column] = parse_decimals(buf, starts, ends)
+                        elif column == "timestamp":
+                            result[column] = parse_timestamps(buf, starts, ends)
+                        else:
+                            result[column] = np.array([buf[s:e].tobytes() for s, e in zip(starts, ends)])
+                    buf = None
+                    yield result
+                    # Drop the finished pages from this process, they stay in the OS page cache
+                    page_end = end // mmap.PAGESIZE * mmap.PAGESIZE
+                    if page_end > released:
+                        mm.madvise(mmap.MADV_DONTNEED, released, page_end - released)
+                        released = page_end
+                    start = end
+            finally:
+                # No view of mm may outlive it, also when the consumer stops early (close, break) or on errors
+                data = buf = None
+
+
+def main(path=target):
+    start = time.perf_counter()
+    rows = malformed = 0
+    total = 0.0
+    for chunk in scan(path, columns=("timestamp", "costs")):
+        rows += len(chunk["costs"])
+        malformed += chunk["malformed"]
+        total += float(np.nansum(chunk["costs"]))
+    elapsed = time.perf_counter() - start
+    print(f"{rows} rows ({malformed} malformed) in {elapsed:.2f} s: {rows / elapsed:.0f} rows/s, "
+          f"mean costs {total / max(rows, 1):.4f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
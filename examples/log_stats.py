@@ -0,0 +1,361 @@
+"""
+Aggregates of the big log (downloaded_log.csv from big_file.py) computed in parallel with bounded memory.
+
+The file is split into byte ranges aligned on line starts, every range is parsed block by block in a
+process pool into a partial LogAggregate, and the partials are merged:
+sum/mean/min/max of costs, row counts per hour and per label, approximate cost quantiles.
+Lines without a numeric cost (the "timestamp,mean" summary lines big_file.py writes) are counted as
+malformed and skipped.
+
+Incremental mode (--checkpoint): the byte offset reached, the partial aggregates and the identity of
+the file (device, inode, fingerprints of its first bytes and of the bytes before the offset) are
+saved after every run, so the next run only parses the bytes appended since. A replaced (rotated),
+truncated or rewritten file is detected and aggregated again from the start. An unterminated last
+line is left for the next run, it may still be being written. --follow keeps polling the file
+and updates the aggregates as it grows.
+
+Usage: python log_stats.py [path] [--processes N] [--parts N] [--checkpoint FILE [--follow [--interval S]]]
+"""
+import argparse
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from big_file import target
+
+COLUMNS = ["timestamp", "label", "code", "costs"]
+BLOCK_SIZE = 16 * 1024 * 1024
+FINGERPRINT_SIZE = 4096
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch of positive values with a bounded relative error (DDSketch):
+    value x falls into bucket ceil(log(x) / log(gamma)), every bucket answers with the same value
+    within relative_accuracy of all values in it. Non-positive values are only counted.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.offset = 0  # counts[i] is bucket offset + i
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.non_positive = 0
+
+    def add(self, values: np.ndarray) -> None:
+        positive = values[values > 0]
+        self.non_positive += len(values) - len(positive)
+        if not len(positive):
+            return
+        buckets = np.ceil(np.log(positive) / math.log(self.gamma)).astype(np.int64)
+        self._add_counts(int(buckets.min()), np.bincount(buckets - buckets.min()))
+
+    def _add_counts(self, offset: int, counts: np.ndarray) -> None:
+        if not len(self.counts):
+            self.offset, self.counts = offset, counts.astype(np.int64)
+            return
+        start = min(self.offset, offset)
+        end = max(self.offset + len(self.counts), offset + len(counts))
+        merged = np.zeros(end - start, dtype=np.int64)
+        merged[self.offset - start:self.offset - start + len(self.counts)] += self.counts
+        merged[offset - start:offset - start + len(counts)] += counts
+        self.offset, self.counts = start, merged
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.non_positive += other.non_positive
+        if len(other.counts):
+            self._add_counts(other.offset, other.counts)
+
+    def to_state(self) -> dict:
+        return {"relative_accuracy": self.relative_accuracy, "offset": self.offset,
+                "counts": self.counts.tolist(), "non_positive": self.non_positive}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "QuantileSketch":
+        sketch = cls(state["relative_accuracy"])
+        sketch.offset, sketch.non_positive = state["offset"], state["non_positive"]
+        sketch.counts = np.array(state["counts"], dtype=np.int64)
+        return sketch
+
+    def quantile(self, q: float) -> float:
+        total = self.counts.sum()
+        if not total:
+            return math.nan
+        bucket = int(np.searchsorted(np.cumsum(self.counts), q * (total - 1), side="right"))
+        return 2 * self.gamma ** (self.offset + bucket) / (self.gamma + 1)
+
+
+class LogAggregate:
+    """Partial aggregates of some rows, merge() combines partials of disjoint rows."""
+
+    def __init__(self):
+        self.rows = 0
+        self.malformed = 0
+        self.costs_sum = 0.0
+        self.costs_min = math.inf
+        self.costs_max = -math.inf
+        self.per_hour = Counter()
+        self.per_label = Counter()
+        self.quantiles = QuantileSketch()
+
+    def add(self, df: pd.DataFrame) -> None:
+        costs = df["costs"]
+        if costs.dtype == object:
+            costs = pd.to_numeric(costs, errors="coerce")
+        valid = costs.notna().to_numpy()
+        self.malformed += int((~valid).sum())
+        if not valid.any():
+            return
+        df, costs = df[valid], costs[valid].to_numpy(dtype=np.float64)
+        self.rows += len(costs)
+        self.costs_sum += float(costs.sum())
+        self.costs_min = min(self.costs_min, float(costs.min()))
+        self.costs_max = max(self.costs_max, float(costs.max()))
+        # Few distinct timestamps repeat many times, count them first and cut to the hour after
+        for timestamp, count in df["timestamp"].value_counts(sort=False).items():
+            self.per_hour[timestamp[:13]] += count
+        self.per_label.update(df["label"].value_counts(sort=False).to_dict())
+        self.quantiles.add(costs)
+
+    def merge(self, other: "LogAggregate") -> "LogAggregate":
+        self.rows += other.rows
+        self.malformed += other.malformed
+        self.costs_sum += other.costs_sum
+        self.costs_min = min(self.costs_min, other.costs_min)
+        self.costs_max = max(self.costs_max, other.costs_max)
+        self.per_hour.update(other.per_hour)
+        self.per_label.update(other.per_label)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def to_state(self) -> dict:
+        state = {name: getattr(self, name) for name in ("rows", "malformed", "costs_sum", "costs_min", "costs_max")}
+        state.update(per_hour=dict(self.per_hour), per_label=dict(self.per_label),
+                     quantiles=self.quantiles.to_state())
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict) -> "LogAggregate":
+        aggregate = cls()
+        for name in ("rows", "malformed", "costs_sum", "costs_min", "costs_max"):
+            setattr(aggregate, name, state[name])
+        aggregate.per_hour = Counter(state["per_hour"])
+        aggregate.per_label = Counter(state["per_label"])
+        aggregate.quantiles = QuantileSketch.from_state(state["quantiles"])
+        return aggregate
+
+    def report(self) -> dict:
+        """Summary of the rows, JSON serializable: statistics of no rows are None."""
+        return {
+            "rows": self.rows,
+            "malformed_lines": self.malformed,
+            "costs": {
+                "sum": round(self.costs_sum, 2),
+                "mean": self.costs_sum / self.rows if self.rows else None,
+                "min": self.costs_min if self.rows else None,
+                "max": self.costs_max if self.rows else None,
+                "quantiles": {str(q): None if math.isnan(value := self.quantiles.quantile(q)) else round(value, 2)
+                              for q in (0.01, 0.25, 0.5, 0.75, 0.99)},
+            },
+            "labels": dict(self.per_label.most_common()),
+            "hours": len(self.per_hour),
+            "busiest_hours": dict(self.per_hour.most_common(5)),
+        }
+
+
+def header_end(path: Path) -> int:
+    """Offset of the first data line (0 when the file has no header)."""
+    with open(path, "rb") as f:
+        first_line = f.readline()
+    return len(first_line) if first_line.startswith(COLUMNS[0].encode()) else 0
+
+
+def byte_ranges(path: Path, parts: int, start: int = None, end: int = None) -> list[tuple[int, int]]:
+    """
+    Splits [start, end) into about `parts` ranges starting at line starts.
+    start defaults to the end of the header, end to the file size; start must be a line start.
+    """
+    start = header_end(path) if start is None else start
+    end = os.path.getsize(path) if end is None else end
+    with open(path, "rb") as f:
+        bounds = [start]
+        for i in range(1, parts):
+            f.seek(max(start + (end - start) * i // parts - 1, bounds[-1]))
+            f.readline()  # move to the start of the next line
+            bounds.append(min(f.tell(), end))
+    bounds.append(end)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def iter_blocks(path: Path, start: int, end: int, block_size: int = BLOCK_SIZE):
+    """Bytes of [start, end) in blocks of whole lines, about block_size each."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        rest = b""
+        remaining = end - start
+        while remaining > 0:
+            data = f.read(min(block_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            data = rest + data
+            cut = data.rfind(b"\n") + 1 if remaining > 0 else len(data)
+            rest = data[cut:]
+            if cut:
+                yield data[:cut]
+        if rest:
+            yield rest
+
+
+def aggregate_range(path: Path, start: int, end: int, block_size: int = BLOCK_SIZE) -> LogAggregate:
+    aggregate = LogAggregate()
+    for block in iter_blocks(path, start, end, block_size):
+        df = pd.read_csv(io.BytesIO(block), header=None, names=COLUMNS, usecols=["timestamp", "label", "costs"],
+                         dtype={"timestamp": str, "label": str})
+        aggregate.add(df)
+    return aggregate
+
+
+def aggregate(path: Path = target, processes: int = None, parts: int = None, start: int = None,
+              end: int = None) -> LogAggregate:
+    """
+    Aggregates the log, or its bytes [start, end), in a process pool.
+    Args:
+        processes: Pool size, CPU count by default.
+        parts: Number of byte ranges, 4 per process by default (balances uneven ranges).
+    """
+    processes = processes or os.cpu_count()
+    ranges = byte_ranges(path, parts or 4 * processes, start, end)
+    if processes == 1:
+        partials = [aggregate_range(path, start, end) for start, end in ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            partials = list(pool.map(aggregate_range, [path] * len(ranges), *zip(*ranges)))
+    result = LogAggregate()
+    for partial in partials:
+        result.merge(partial)
+    return result
+
+
+def _fingerprint(f, start: int, end: int) -> str:
+    f.seek(start)
+    return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def file_identity(path: Path, offset: int) -> dict:
+    """Identity of the file as far as it was read: device, inode and fingerprints up to offset."""
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        return {
+            "device": stat.st_dev,
+            "inode": stat.st_ino,
+            "head": _fingerprint(f, 0, min(offset, FINGERPRINT_SIZE)),
+            "tail": _fingerprint(f, max(0, offset - FINGERPRINT_SIZE), offset),
+        }
+
+
+def load_checkpoint(checkpoint: Path, path: Path) -> tuple[int, LogAggregate]:
+    """
+    Offset and aggregates of the last run if the file is still the one that was read, else (start, empty).
+    """
+    if not Path(checkpoint).is_file():
+        return header_end(path), LogAggregate()
+    state = json.loads(Path(checkpoint).read_text())
+    offset = state["offset"]
+    if os.path.getsize(path) < offset:
+        logging.warning("%s was truncated, aggregating it again", path)
+    elif file_identity(path, offset) != state["identity"]:
+        logging.warning("%s was replaced or rewritten, aggregating it again", path)
+    else:
+        return offset, LogAggregate.from_state(state["aggregate"])
+    return header_end(path), LogAggregate()
+
+
+def save_checkpoint(checkpoint: Path, path: Path, offset: int, result: LogAggregate) -> None:
+    state = {"path": str(Path(path).resolve()), "offset": offset, "identity": file_identity(path, offset),
+             "aggregate": result.to_state()}
+    tmp = Path(checkpoint).with_name(Path(checkpoint).name + ".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, checkpoint)
+
+
+def complete_lines_end(path: Path, start: int) -> int:
+    """Offset after the last newline in the file (at least start)."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        position = size
+        while position > start:
+            block_start = max(start, position - 64 * 1024)
+            f.seek(block_start)
+            block = f.read(position - block_start)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                return block_start + newline + 1
+            position = block_start
+    return start
+
+
+def update(path: Path, checkpoint: Path, processes: int = None) -> tuple[LogAggregate, int]:
+    """
+    Aggregates the lines appended since the checkpoint and saves the new checkpoint.
+    Returns:
+        The aggregates of the whole file and the number of bytes parsed in this call.
+    """
+    offset, result = load_checkpoint(checkpoint, path)
+    end = complete_lines_end(path, offset)
+    if end > offset:
+        result.merge(aggregate(path, processes, start=offset, end=end))
+    save_checkpoint(checkpoint, path, end, result)
+    return result, end - offset
+
+
+def follow(path: Path, checkpoint: Path, interval: float = 1.0, processes: int = None) -> None:
+    """Updates the aggregates whenever the file grows, until interrupted."""
+    while True:
+        if Path(path).is_file():
+            result, n_bytes = update(path, checkpoint, processes)
+            if n_bytes:
+                report = result.report()
+                logging.info("+%d bytes: %d rows, mean costs %s, p99 %s", n_bytes, report["rows"],
+                             report["costs"]["mean"], report["costs"]["quantiles"]["0.99"])
+        time.sleep(interval)
+
+
+def main():
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Aggregates of the big log.")
+    parser.add_argument("path", type=Path, nargs="?", default=target)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--parts", type=int)
+    parser.add_argument("--checkpoint", type=Path, help="Resume from and save to this checkpoint file")
+    parser.add_argument("--follow", action="store_true", help="Keep updating as the file grows (needs --checkpoint)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval of --follow in seconds")
+    args = parser.parse_args()
+    if args.follow and not args.checkpoint:
+        parser.error("--follow needs --checkpoint")
+    if args.follow:
+        follow(args.path, args.checkpoint, args.interval, args.processes)
+        return
+
+    start = time.perf_counter()
+    if args.checkpoint:
+        result, size = update(args.path, args.checkpoint, args.processes)
+    else:
+        result, size = aggregate(args.path, args.processes, args.parts), os.path.getsize(args.path)
+    elapsed = time.perf_counter() - start
+    print(json.dumps(result.report(), indent=2))
+    logging.info("%.1f MB parsed in %.2f s: %.1f MB/s", size / 2 ** 20, elapsed, size / 2 ** 20 / elapsed)
+
+
+if __name__ == "__main__":
+    main()
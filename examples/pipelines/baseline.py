@@ -4,14 +4,20 @@ from pathlib import Path
 
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.metrics import classification_report, accuracy_score
+from sklearn.pipeline import Pipeline
+
+from evaluation import evaluate_cached, log_evaluation
+from experiment_store import ExperimentStore, StageTimer, fingerprint_data, fingerprint_estimator
+from model_registry import load_artifact, save_artifact
 
 
 # Paths
 DATA = Path(__file__).parent / "data"
 DATA.mkdir(exist_ok=True)
-VECTORIZER_PATH = DATA / "vectorizer.pkl"
-MODEL_PATH = DATA / "model.pkl"
+VECTORIZER_PATH = DATA / "vectorizer.model"
+MODEL_PATH = DATA / "classifier.model"
+# Fitted artifacts and results of earlier runs, keyed by data, parameters and library versions
+STORE = ExperimentStore(DATA / "experiments")
 
 
 def save_pickle(obj: object, path: Path) -> None:
@@ -52,28 +58,49 @@ def load_test_data() -> tuple[list[str], list[int]]:
 
 def train_model(texts: list[str], labels: list[int],
                 vectorizer_path: Path = VECTORIZER_PATH,
-                model_path: Path = MODEL_PATH) -> None:
+                model_path: Path = MODEL_PATH, store: ExperimentStore | None = None) -> None:
+    """Fits and saves the vectorizer and the classifier. With a store, unchanged runs are copied from it."""
     vectorizer = CountVectorizer()
-    instances = vectorizer.fit_transform(texts)
-
     classifier = MultinomialNB()
-    classifier.fit(instances, labels)
-
-    save_pickle(vectorizer, vectorizer_path)
-    save_pickle(classifier, model_path)
+    timer = StageTimer()
+
+    if store is not None:
+        with timer('fingerprint'):
+            key = store.key('baseline', fingerprint_data(texts, labels), fingerprint_estimator(vectorizer),
+                            fingerprint_estimator(classifier))
+        if store.has_artifacts(key, 'vectorizer', 'classifier'):
+            logging.info("Unchanged training data and parameters, reusing %s", store.run_dir(key))
+            store.export_artifact(key, 'vectorizer', vectorizer_path)
+            store.export_artifact(key, 'classifier', model_path)
+            return
+
+    with timer('fit'):
+        instances = vectorizer.fit_transform(texts)
+        classifier.fit(instances, labels)
+
+    with timer('save'):
+        if store is None:
+            save_artifact(vectorizer, vectorizer_path)
+            save_artifact(classifier, model_path)
+        else:
+            store.save_artifact(key, 'vectorizer', vectorizer)
+            store.save_artifact(key, 'classifier', classifier)
+            store.export_artifact(key, 'vectorizer', vectorizer_path)
+            store.export_artifact(key, 'classifier', model_path)
+            store.save_results(key, 'training', {'timings': timer, 'n_samples': len(texts)})
+    logging.info("Training: %s", timer.summary())
 
 
 def eval_model(texts: list[str], labels: list[int],
-               vectorizer_path: Path = VECTORIZER_PATH, model_path: Path = MODEL_PATH
-               ) -> None:
-    vectorizer = load_pickle(vectorizer_path)
-    classifier = load_pickle(model_path)
-
-    instances = vectorizer.transform(texts)
-    y_pred = classifier.predict(instances)
+               vectorizer_path: Path = VECTORIZER_PATH, model_path: Path = MODEL_PATH,
+               batch_size: int = 1000, n_jobs: int = 1, store: ExperimentStore | None = None) -> None:
+    # Cached per process, files are read again only after they change
+    vectorizer = load_artifact(vectorizer_path)
+    classifier = load_artifact(model_path)
 
-    logging.info("Accuracy: %s", accuracy_score(labels, y_pred))
-    logging.info("\nClassification Report:\n%s", classification_report(labels, y_pred))
+    # Texts are vectorized and predicted batch by batch, see evaluation.evaluate
+    model = Pipeline([('vectorizer', vectorizer), ('classifier', classifier)])
+    log_evaluation(evaluate_cached(model, texts, labels, store, batch_size=batch_size, n_jobs=n_jobs))
 
 
 if __name__ == '__main__':
@@ -82,5 +109,5 @@ if __name__ == '__main__':
     train_texts, train_labels = load_train_data()
     test_texts, test_labels = load_test_data()
 
-    train_model(train_texts, train_labels)
-    eval_model(test_texts, test_labels)
\ No newline at end of file
+    train_model(train_texts, train_labels, store=STORE)
+    eval_model(test_texts, test_labels, store=STORE)
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Peak memory of fitting and pickling the pipelines_complex pipeline on 20newsgroups: the former dense
+conversion + MinMaxScaler versus MaxAbsScaler on the sparse feature matrix.
+
+Usage: python bench_memory.py [n_docs]
+
+The dense matrix is documents x vocabulary float64, so keep n_docs small (the default 1000 already
+needs hundreds of MB), the full training set would need tens of GB.
+"""
+import logging
+import pickle
+import sys
+import time
+import tracemalloc
+
+from sklearn.datasets import fetch_20newsgroups
+from sklearn.preprocessing import FunctionTransformer, MinMaxScaler
+
+from pipelines_complex import create_pipeline
+
+
+def to_dense(x):
+    return x.toarray()
+
+
+def create_dense_pipeline():
+    """The pipeline as it was: features converted to a dense array before MinMaxScaler."""
+    pipeline = create_pipeline()
+    pipeline.steps[1:2] = [('to_dense', FunctionTransformer(to_dense, accept_sparse=True)),
+                           ('scaler', MinMaxScaler())]
+    return pipeline
+
+
+def measure(pipeline, texts, labels):
+    tracemalloc.start()
+    start = time.perf_counter()
+    pipeline.fit(texts, labels)
+    pipeline.predict(texts)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed, len(pickle.dumps(pipeline))
+
+
+def main(n_docs=1000):
+    data = fetch_20newsgroups(subset='train', remove=('headers', 'footers', 'quotes'))
+    texts, labels = data.data[:n_docs], data.target[:n_docs]
+    logging.info("%d documents", len(texts))
+    logging.info("%-24s %14s %10s %12s", "pipeline", "peak [MB]", "time [s]", "pickle [kB]")
+    for name, pipeline in [('dense + MinMaxScaler', create_dense_pipeline()),
+                           ('sparse + MaxAbsScaler', create_pipeline())]:
+        peak, elapsed, size = measure(pipeline, texts, labels)
+        logging.info("%-24s %14.1f %10.2f %12.1f", name, peak / 2**20, elapsed, size / 2**10)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,92 @@
+"""
+Cold-start time and per-worker memory of a text classification model: pickle, joblib (with and
+without mmap_mode) and model_registry (with and without memory mapping).
+
+The model is a CountVectorizer + LogisticRegression pipeline trained on a synthetic corpus, its
+coef_ matrix (n_classes x vocabulary) is the large array. Cold start is timed in a fresh process
+alone. Then n_workers fresh processes each load the model, wait for the others and report RSS and
+PSS (RSS with shared pages divided among the processes sharing them) from /proc/self/smaps_rollup.
+
+Usage: python bench_registry.py [vocabulary size] [workers]
+"""
+import logging
+import multiprocessing
+import pickle
+import random
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import joblib
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+
+from model_registry import load_artifact, save_artifact
+
+
+def train(vocabulary_size, n_classes=20, n_docs=4000, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary_size)]
+    texts = [" ".join(rng.choices(words, k=300)) for _ in range(n_docs)]
+    labels = [rng.randrange(n_classes) for _ in range(n_docs)]
+    return Pipeline([
+        ('vectorizer', CountVectorizer()),
+        ('classifier', LogisticRegression(max_iter=5)),
+    ]).fit(texts, labels)
+
+
+def memory_kb():
+    values = {}
+    for line in Path("/proc/self/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":")
+        values[name] = int(value.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def worker(path, mode, barrier):
+    start = time.perf_counter()
+    if mode == "pickle":
+        model = pickle.loads(Path(path).read_bytes())
+    elif mode.startswith("joblib"):
+        model = joblib.load(path, mmap_mode="r" if mode.endswith("mmap") else None)
+    else:
+        model = load_artifact(path, mmap_mode="r" if mode.endswith("mmap") else None)
+    elapsed = time.perf_counter() - start
+    model.predict(["w1 w2 w3"])
+    barrier.wait()
+    rss, pss = memory_kb()
+    barrier.wait()  # keep every worker alive until all have measured
+    return elapsed, rss, pss
+
+
+def main(vocabulary_size=200_000, n_workers=4):
+    logging.info("Training a model with a %d word vocabulary...", vocabulary_size)
+    model = train(vocabulary_size)
+    context = multiprocessing.get_context("spawn")
+    with TemporaryDirectory() as tmp, context.Manager() as manager:
+        pickle_path, joblib_path, artifact_path = (Path(tmp) / name for name in ("model.pkl", "model.joblib",
+                                                                                   "model.bin"))
+        pickle_path.write_bytes(pickle.dumps(model))
+        joblib.dump(model, joblib_path)
+        save_artifact(model, artifact_path)
+        with context.Pool(1) as pool:  # unmeasured run, warms the OS file cache and shared libraries
+            pool.apply(worker, (pickle_path, "pickle", manager.Barrier(1)))
+        logging.info("%-18s %12s %12s %12s", "load", "cold [ms]", "RSS [MB]", "PSS [MB]")
+        runs = [("pickle", pickle_path), ("joblib", joblib_path), ("joblib mmap", joblib_path),
+                ("registry", artifact_path), ("registry mmap", artifact_path)]
+        for mode, path in runs:
+            # Cold start of a single process, then memory of n_workers processes loading concurrently
+            with context.Pool(1) as pool:
+                elapsed = pool.apply(worker, (path, mode, manager.Barrier(1)))[0]
+            barrier = manager.Barrier(n_workers)
+            with context.Pool(n_workers) as pool:
+                results = pool.starmap(worker, [(path, mode, barrier)] * n_workers)
+            rss = sum(r[1] for r in results) / n_workers / 1024
+            pss = sum(r[2] for r in results) / n_workers / 1024
+            logging.info("%-18s %12.1f %12.1f %12.1f", mode, elapsed * 1000, rss, pss)
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    main(*(int(a) for a in sys.argv[1:3]))
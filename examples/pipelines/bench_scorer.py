@@ -0,0 +1,64 @@
+"""
+Latency of pipeline.predict versus the exported linear_scorer.LinearTextScorer: one document per call
+(median over repeats) and batches of documents (texts/s), for MultinomialNB and LogisticRegression
+pipelines trained on a synthetic corpus. Predictions of both are compared on every text.
+
+Usage: python bench_scorer.py [vocabulary size] [batch size]
+"""
+import logging
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+from linear_scorer import export_scorer
+
+
+def corpus(vocabulary_size, n_docs, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary_size)]
+    return [" ".join(rng.choices(words, k=rng.randrange(5, 60))) for _ in range(n_docs)]
+
+
+def single_latency_us(predict, texts, repeats=2000):
+    times = []
+    for text in texts[:repeats]:
+        start = time.perf_counter()
+        predict([text])
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e6
+
+
+def batch_throughput(predict, texts, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        predict(texts[i:i + batch_size])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main(vocabulary_size=50_000, batch_size=256):
+    vocabulary_size, batch_size = int(vocabulary_size), int(batch_size)
+    train_texts = corpus(vocabulary_size, 5000)
+    labels = [random.Random(i).randrange(10) for i in range(len(train_texts))]
+    test_texts = corpus(vocabulary_size, 20_000, seed=1)
+
+    print(f"{'model':22s} {'predict':>10s} {'1 doc [us]':>11s} {f'batch {batch_size} [texts/s]':>22s}")
+    for name, classifier in [("MultinomialNB", MultinomialNB()), ("LogisticRegression", LogisticRegression(max_iter=50))]:
+        pipeline = Pipeline([('vectorizer', CountVectorizer()), ('classifier', classifier)]).fit(train_texts, labels)
+        scorer = export_scorer(pipeline)
+        if not np.array_equal(pipeline.predict(test_texts), scorer.predict(test_texts)):
+            raise AssertionError(f"{name}: scorer predictions differ from the pipeline")
+        for method, predict in [("pipeline", pipeline.predict), ("scorer", scorer.predict)]:
+            print(f"{name:22s} {method:>10s} {single_latency_us(predict, test_texts):11.1f} "
+                  f"{batch_throughput(predict, test_texts, batch_size):22.0f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    main(*sys.argv[1:3])
@@ -0,0 +1,212 @@
+"""
+Streaming evaluation: the test set is consumed in batches, every batch is predicted on its own and only
+a confusion matrix is accumulated, so neither the feature matrix nor the predictions of the whole test
+set are ever held in memory. The report is the same as sklearn's classification_report.
+
+Batches are optionally predicted in a process pool; the model is then sent to (or, given as a path,
+loaded by) every worker once, not with every batch.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+from sklearn.metrics import classification_report
+
+from experiment_store import ExperimentStore, fingerprint_data, fingerprint_model
+from model_registry import load_artifact
+
+
+def batches(X: Iterable[str], y: Iterable, batch_size: int) -> Iterator[tuple[list[str], list]]:
+    """Pairs of (texts, labels) lists of at most batch_size items."""
+    pairs = zip(X, y)
+    while batch := list(islice(pairs, batch_size)):
+        texts, labels = zip(*batch)
+        yield list(texts), list(labels)
+
+
+class ConfusionMatrix:
+    """Confusion matrix that grows with the labels seen, rows are true labels, columns predictions."""
+
+    def __init__(self, labels: Iterable = ()):
+        self.labels = []
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self._add_labels(labels)
+
+    def _add_labels(self, labels: Iterable) -> None:
+        new = sorted(set(labels) - set(self.labels))
+        if not new:
+            return
+        old_labels, old_counts = self.labels, self.counts
+        self.labels = sorted(old_labels + new)
+        positions = np.searchsorted(self.labels, old_labels) if old_labels else np.empty(0, dtype=np.int64)
+        self.counts = np.zeros((len(self.labels), len(self.labels)), dtype=np.int64)
+        self.counts[np.ix_(positions, positions)] = old_counts
+
+    def update(self, y_true, y_pred) -> "ConfusionMatrix":
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        self._add_labels(np.unique(np.concatenate([y_true, y_pred])).tolist())
+        n = len(self.labels)
+        cells = np.searchsorted(self.labels, y_true) * n + np.searchsorted(self.labels, y_pred)
+        self.counts += np.bincount(cells, minlength=n * n).reshape(n, n)
+        return self
+
+    def merge(self, other: "ConfusionMatrix") -> "ConfusionMatrix":
+        self._add_labels(other.labels)
+        positions = np.searchsorted(self.labels, other.labels)
+        self.counts[np.ix_(positions, positions)] += other.counts
+        return self
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.counts.sum())
+
+    def accuracy(self) -> float:
+        return float(np.trace(self.counts) / max(self.n_samples, 1))
+
+    def report(self, digits: int = 2, zero_division=0.0) -> str:
+        """classification_report of the accumulated predictions (sklearn's metrics and layout)."""
+        if not self.n_samples:
+            return "no samples"
+        n = len(self.labels)
+        # Every cell once, weighted by its count
+        scores = classification_report(np.repeat(self.labels, n), np.tile(self.labels, n),
+                                       sample_weight=self.counts.ravel(), output_dict=True,
+                                       zero_division=zero_division)
+        supports = self.counts.sum(axis=1)
+        names = [str(label) for label in self.labels]
+        width = max(*(len(name) for name in names), len("weighted avg"), digits)
+        headers = ["precision", "recall", "f1-score", "support"]
+        row_fmt = "{:>{width}s} " + " {:>9.{digits}f}" * 3 + " {:>9}\n"
+        report = ("{:>{width}s} " + " {:>9}" * len(headers)).format("", *headers, width=width) + "\n\n"
+        for name, support in zip(names, supports):
+            row = scores[name]
+            report += row_fmt.format(name, row["precision"], row["recall"], row["f1-score"], int(support),
+                                     width=width, digits=digits)
+        report += "\n"
+        total = int(supports.sum())
+        if "accuracy" in scores:
+            report += ("{:>{width}s} " + " {:>9.{digits}}" * 2 + " {:>9.{digits}f}" + " {:>9}\n").format(
+                "accuracy", "", "", scores["accuracy"], total, width=width, digits=digits)
+        for average in ("macro avg", "weighted avg"):
+            row = scores[average]
+            report += row_fmt.format(average, row["precision"], row["recall"], row["f1-score"], total,
+                                     width=width, digits=digits)
+        return report
+
+
+class BatchStats:
+    """Rows and predict latency of every batch."""
+
+    def __init__(self):
+        self.rows = []
+        self.latencies = []
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add(self, rows: int, latency: float) -> None:
+        self.rows.append(rows)
+        self.latencies.append(latency)
+
+    def finish(self) -> "BatchStats":
+        self.elapsed = time.perf_counter() - self.start
+        return self
+
+    def summary(self) -> str:
+        if not self.rows:
+            return "no batches"
+        latencies = np.array(self.latencies) * 1000
+        rows = sum(self.rows)
+        return (f"{rows} rows in {len(self.rows)} batches, {self.elapsed:.2f} s: "
+                f"{rows / max(self.elapsed, 1e-9):.0f} rows/s overall, "
+                f"{rows / max(sum(self.latencies), 1e-9):.0f} rows/s in predict, batch latency [ms] "
+                f"p50 {np.percentile(latencies, 50):.1f} p95 {np.percentile(latencies, 95):.1f} "
+                f"max {latencies.max():.1f}")
+
+
+def _predict_batch(model, texts: list[str], labels: list) -> tuple[ConfusionMatrix, int, float]:
+    start = time.perf_counter()
+    y_pred = model.predict(texts)
+    latency = time.perf_counter() - start
+    return ConfusionMatrix().update(labels, y_pred), len(texts), latency
+
+
+_worker_model = None
+
+
+def _init_worker(model) -> None:
+    global _worker_model
+    _worker_model = load_artifact(model) if isinstance(model, Path) else model
+
+
+def _predict_in_worker(texts: list[str], labels: list) -> tuple[ConfusionMatrix, int, float]:
+    return _predict_batch(_worker_model, texts, labels)
+
+
+def evaluate(model, texts: Iterable[str], labels: Iterable, batch_size: int = 1000,
+             n_jobs: int = 1) -> tuple[ConfusionMatrix, BatchStats]:
+    """
+    Predicts texts batch by batch and accumulates the confusion matrix against labels.
+    Args:
+        model: Fitted estimator with predict, or the path of a saved one (loaded by model_registry).
+        texts, labels: Iterables consumed in lockstep, they may be generators reading from disk.
+        batch_size: Texts per predict call.
+        n_jobs: Worker processes, 1 predicts in this process. At most 2 * n_jobs batches are in flight.
+    """
+    stats = BatchStats()
+    confusion = ConfusionMatrix()
+    if n_jobs == 1:
+        model = load_artifact(model) if isinstance(model, Path) else model
+        for batch_texts, batch_labels in batches(texts, labels, batch_size):
+            batch_confusion, rows, latency = _predict_batch(model, batch_texts, batch_labels)
+            confusion.merge(batch_confusion)
+            stats.add(rows, latency)
+        return confusion, stats.finish()
+
+    with ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=(model,)) as executor:
+        pending = []
+        for batch in batches(texts, labels, batch_size):
+            pending.append(executor.submit(_predict_in_worker, *batch))
+            if len(pending) >= 2 * n_jobs:
+                batch_confusion, rows, latency = pending.pop(0).result()
+                confusion.merge(batch_confusion)
+                stats.add(rows, latency)
+        for future in pending:
+            batch_confusion, rows, latency = future.result()
+            confusion.merge(batch_confusion)
+            stats.add(rows, latency)
+    return confusion, stats.finish()
+
+
+def summarize(confusion: ConfusionMatrix, stats: BatchStats) -> dict:
+    return {'accuracy': confusion.accuracy(), 'report': confusion.report(), 'throughput': stats.summary(),
+            'labels': confusion.labels, 'confusion_matrix': confusion.counts.tolist()}
+
+
+def evaluate_cached(model, texts: Iterable[str], labels: Iterable, store: ExperimentStore | None = None,
+                    batch_size: int = 1000, n_jobs: int = 1) -> dict:
+    """
+    summarize(*evaluate(...)), reused from store when the fitted model and the test data are unchanged
+    (throughput is then not measured).
+    Test data that are not sequences (e.g. generators) cannot be fingerprinted and are always evaluated.
+    """
+    if store is None or not (isinstance(texts, Sequence) and isinstance(labels, Sequence)):
+        return summarize(*evaluate(model, texts, labels, batch_size=batch_size, n_jobs=n_jobs))
+    fitted = load_artifact(model) if isinstance(model, Path) else model
+    key = store.key('evaluation', fingerprint_model(fitted), fingerprint_data(texts, labels))
+    if (results := store.load_results(key, 'evaluation')) is not None:
+        logging.info("Unchanged model and test data, evaluation results reused from %s", store.run_dir(key))
+        return {**results, 'throughput': "not measured, results reused"}
+    results = summarize(*evaluate(model, texts, labels, batch_size=batch_size, n_jobs=n_jobs))
+    # Throughput is a measurement of this run, not a result of the model and data
+    store.save_results(key, 'evaluation', {name: value for name, value in results.items() if name != 'throughput'})
+    return results
+
+
+def log_evaluation(results: dict) -> None:
+    logging.info("Accuracy: %s", results['accuracy'])
+    logging.info("\nClassification Report:\n%s", results['report'])
+    logging.info("Throughput: %s", results['throughput'])
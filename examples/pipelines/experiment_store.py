@@ -0,0 +1,131 @@
+"""
+Content-addressed store of experiment results, so unchanged experiments are not trained again.
+
+A run is keyed by a hash of everything its result depends on: fingerprints of the data, of the
+(unfitted) estimators with all their parameters, and the versions of Python and the libraries doing
+the work. A run directory holds fitted artifacts (saved by model_registry) and JSON results, e.g.
+evaluation metrics, cross-validation scores and per-stage timings:
+
+    <root>/<key[:2]>/<key>/<name>.model|.joblib    fitted artifacts
+    <root>/<key[:2]>/<key>/<name>.json             results
+
+Everything is written atomically, a run interrupted halfway leaves only complete entries behind.
+"""
+import filecmp
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable
+
+import joblib
+import numpy as np
+import scipy
+import sklearn
+from sklearn.base import clone
+
+from model_registry import load_artifact, save_artifact
+
+
+def library_versions() -> dict:
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'sklearn': sklearn.__version__, 'joblib': joblib.__version__}
+
+
+def fingerprint_data(texts: Iterable[str], labels: Iterable) -> str:
+    """Hash of texts and labels (in order), computed in one pass."""
+    digest = hashlib.blake2b(digest_size=16)
+    for text, label in zip(texts, labels):
+        digest.update(f"{len(text)}:{text}\t{label!r}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def fingerprint_estimator(estimator) -> str:
+    """Hash of an estimator's class and parameters (also of nested estimators), fitted state excluded."""
+    estimator = clone(estimator)
+    # Caching of transformer steps changes nothing in the result
+    if 'memory' in estimator.get_params(deep=False):
+        estimator.set_params(memory=None)
+    return joblib.hash(estimator)
+
+
+def fingerprint_model(model) -> str:
+    """Hash of a fitted model, its learned arrays and attributes included."""
+    return joblib.hash(model)
+
+
+class StageTimer(dict):
+    """Wall-clock seconds per stage: with timer('fit'): ..."""
+
+    @contextmanager
+    def __call__(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self[stage] = self.get(stage, 0.0) + time.perf_counter() - start
+
+    def summary(self) -> str:
+        return ", ".join(f"{stage} {seconds:.3f} s" for stage, seconds in self.items())
+
+
+class ExperimentStore:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """Run key of JSON-serializable parts (fingerprints, settings) and the library versions."""
+        content = json.dumps([parts, library_versions()], sort_keys=True, default=repr)
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+    def run_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def artifact_path(self, key: str, name: str) -> Path:
+        """Path of an artifact of the run, its directory is created.
+
+        name may carry a suffix (e.g. "pipeline.joblib"), model_registry picks the file format by it.
+        """
+        path = self._artifact_path(key, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _artifact_path(self, key: str, name: str) -> Path:
+        return self.run_dir(key) / (name if Path(name).suffix else f"{name}.model")
+
+    def has_artifacts(self, key: str, *names: str) -> bool:
+        return all(self._artifact_path(key, name).exists() for name in names)
+
+    def save_artifact(self, key: str, name: str, obj: object) -> None:
+        save_artifact(obj, self.artifact_path(key, name))
+
+    def load_artifact(self, key: str, name: str) -> object:
+        return load_artifact(self._artifact_path(key, name))
+
+    def export_artifact(self, key: str, name: str, path: Path) -> None:
+        """Copies a stored artifact to path (atomically), unless path already holds the same bytes."""
+        source, path = self._artifact_path(key, name), Path(path)
+        if path.exists() and filecmp.cmp(source, path, shallow=False):
+            return
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.copyfile(source, tmp)
+        os.replace(tmp, path)
+        logging.info(f"Copied stored {name} to {path}")
+
+    def load_results(self, key: str, name: str) -> dict | None:
+        path = self.run_dir(key) / f"{name}.json"
+        return json.loads(path.read_text(encoding='utf-8')) if path.exists() else None
+
+    def save_results(self, key: str, name: str, results: dict) -> None:
+        path = self.run_dir(key) / f"{name}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps({**results, 'versions': library_versions()}, indent=2, default=repr),
+                       encoding='utf-8')
+        os.replace(tmp, path)
@@ -0,0 +1,180 @@
+"""
+Feature-space pruning: fewer vocabulary terms make smaller and faster models.
+
+Terms are pruned by document frequency (the vectorizer's min_df) or selected by a score with
+SelectKBest, plugged in with create_pipeline(selector=...) of pipelines_basic, pipelines_complex or
+pipelines_gridsearch:
+    chi2                the chi-squared statistic of term counts and classes (sklearn)
+    mutual_information  mutual information of term presence and classes, from the term-class
+                        contingency counts (vectorized; sklearn's mutual_info_classif estimates it
+                        feature by feature, about 2 ms per term)
+
+A fitted selector does not make the pipeline smaller by itself, the vectorizer still keeps the full
+vocabulary (and stop_words_, every pruned term). compact() folds the selection into the vocabulary.
+
+Usage: python feature_selection.py [accuracy budget] [corpus files...]
+    compares the settings of SETTINGS on the corpus files ("<label>\\t<text>" lines, see
+    pipelines_streaming) or on a synthetic corpus, and picks the smallest model whose accuracy is
+    at most the budget (default 0.01) below the best one
+"""
+import copy
+import logging
+import pickle
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_selection import SelectKBest, chi2
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from pipelines_basic import create_pipeline
+from pipelines_streaming import iter_corpus
+
+
+def mutual_information(X, y) -> np.ndarray:
+    """Mutual information (nats) between the presence of every term (column of X) and the class."""
+    classes, y = np.unique(y, return_inverse=True)
+    n = X.shape[0]
+    presence = (sp.csr_matrix(X) > 0).astype(np.float64)
+    one_hot = sp.csr_matrix((np.ones(n), (y, np.arange(n))), shape=(len(classes), n))
+    present = np.asarray((one_hot @ presence).todense())  # (classes, terms) documents with the term
+    class_counts = np.bincount(y).astype(np.float64)[:, None]
+    document_frequency = present.sum(axis=0)
+    scores = np.zeros(X.shape[1])
+    for joint, term_count in [(present, document_frequency), (class_counts - present, n - document_frequency)]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = joint / n * np.log(joint * n / (term_count * class_counts))
+        scores += np.nansum(np.where(joint > 0, terms, 0.0), axis=0)
+    return scores
+
+
+def compact(pipeline: Pipeline) -> Pipeline:
+    """
+    Pipeline of a CountVectorizer, a fitted selector and a classifier as a vectorizer + classifier
+    pipeline with the same predictions: the vocabulary keeps only the selected terms (in the same
+    order), the selector is dropped. stop_words_ (only needed for introspection) is removed as well.
+
+    Only a single CountVectorizer can be compacted, not a FeatureUnion or a TfidfVectorizer (as in
+    pipelines_gridsearch): TF-IDF rows are normalized over all terms, so dropping terms from the
+    vocabulary would change the values of the selected ones as well. Such pipelines raise ValueError.
+    """
+    (vectorizer_name, vectorizer), *middle, (classifier_name, classifier) = pipeline.steps
+    middle = [step for _, step in middle if step not in (None, 'passthrough')]
+    if type(vectorizer) is not CountVectorizer or len(middle) > 1 or \
+            (middle and not hasattr(middle[0], 'get_support')):
+        raise ValueError(f"Expected a CountVectorizer, at most a selector and a classifier, got {pipeline.steps}")
+    vectorizer = copy.deepcopy(vectorizer)
+    if middle:
+        support = middle[0].get_support()
+        terms = sorted((index, term) for term, index in vectorizer.vocabulary_.items() if support[index])
+        vectorizer.vocabulary_ = {term: new_index for new_index, (_, term) in enumerate(terms)}
+    if hasattr(vectorizer, 'stop_words_'):
+        del vectorizer.stop_words_
+    return Pipeline([(vectorizer_name, vectorizer), (classifier_name, classifier)])
+
+
+def n_terms(pipeline: Pipeline) -> int:
+    return len(pipeline.steps[0][1].vocabulary_)
+
+
+def predict_latency(model, texts: list[str], batch_size: int = 256, repeats: int = 500) -> tuple[float, float]:
+    """Median latency [ms] of predicting one text and throughput [texts/s] in batches of batch_size."""
+    times = []
+    for text in texts[:repeats]:
+        start = time.perf_counter()
+        model.predict([text])
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        model.predict(texts[i:i + batch_size])
+    return statistics.median(times) * 1000, len(texts) / (time.perf_counter() - start)
+
+
+SETTINGS = [
+    # name, pipeline parameters, selector
+    ('all terms', {}, None),
+    ('min_df=3', {'vectorizer__min_df': 3}, None),
+    ('min_df=10', {'vectorizer__min_df': 10}, None),
+    ('chi2 k=5000', {}, SelectKBest(chi2, k=5000)),
+    ('chi2 k=1000', {}, SelectKBest(chi2, k=1000)),
+    ('chi2 k=200', {}, SelectKBest(chi2, k=200)),
+    ('mutual_information k=5000', {}, SelectKBest(mutual_information, k=5000)),
+    ('mutual_information k=1000', {}, SelectKBest(mutual_information, k=1000)),
+    ('mutual_information k=200', {}, SelectKBest(mutual_information, k=200)),
+    ('min_df=3 + chi2 k=1000', {'vectorizer__min_df': 3}, SelectKBest(chi2, k=1000)),
+]
+
+
+def tradeoff(texts: list[str], labels: list, settings=SETTINGS, test_size: float = 0.25) -> list[dict]:
+    """Accuracy, vocabulary size, pickled model size and predict latency of every setting."""
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        texts, labels, test_size=test_size, random_state=0, stratify=labels)
+    results = []
+    for name, params, selector in settings:
+        start = time.perf_counter()
+        # A fresh selector for every run, SETTINGS holds unfitted templates
+        selector = clone(selector) if selector is not None else None
+        pipeline = create_pipeline(selector=selector).set_params(**params).fit(train_texts, train_labels)
+        fit_seconds = time.perf_counter() - start
+        model = compact(pipeline)
+        single_ms, texts_per_second = predict_latency(model, test_texts)
+        results.append({
+            'name': name, 'accuracy': accuracy_score(test_labels, model.predict(test_texts)),
+            'terms': n_terms(model), 'size_kb': len(pickle.dumps(model, protocol=5)) / 1024,
+            'uncompacted_kb': len(pickle.dumps(pipeline, protocol=5)) / 1024,
+            'fit_s': fit_seconds, 'single_ms': single_ms, 'texts_per_s': texts_per_second,
+        })
+    return results
+
+
+def smallest_within(results: list[dict], budget: float) -> dict:
+    """Smallest model (pickled size) whose accuracy is at most budget below the best one."""
+    best = max(result['accuracy'] for result in results)
+    return min((result for result in results if result['accuracy'] >= best - budget), key=lambda r: r['size_kb'])
+
+
+def synthetic_corpus(n_docs: int = 6000, vocabulary_size: int = 30_000, n_classes: int = 5,
+                     topic_words: int = 40, seed: int = 0) -> tuple[list[str], list[int]]:
+    """Documents of Zipf-distributed background words and a few words specific to their class."""
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    topics = [rng.sample(words, topic_words) for _ in range(n_classes)]
+    texts, labels = [], []
+    for _ in range(n_docs):
+        label = rng.randrange(n_classes)
+        tokens = rng.choices(words, weights, k=rng.randrange(20, 120))
+        tokens += rng.choices(topics[label], k=rng.randrange(1, 6))
+        rng.shuffle(tokens)
+        texts.append(" ".join(tokens))
+        labels.append(label)
+    return texts, labels
+
+
+def main(budget=0.01, *corpus_files):
+    if corpus_files:
+        texts, labels = map(list, zip(*iter_corpus(Path(p) for p in corpus_files)))
+    else:
+        texts, labels = synthetic_corpus()
+    results = tradeoff(texts, labels)
+    logging.info("%-28s %9s %8s %10s %14s %8s %11s %11s", "setting", "accuracy", "terms", "size [kB]",
+                 "uncompacted", "fit [s]", "1 text [ms]", "texts/s")
+    for r in results:
+        logging.info("%-28s %9.3f %8d %10.1f %14.1f %8.2f %11.3f %11.0f", r['name'], r['accuracy'], r['terms'],
+                     r['size_kb'], r['uncompacted_kb'], r['fit_s'], r['single_ms'], r['texts_per_s'])
+    pick = smallest_within(results, float(budget))
+    logging.info("Smallest model within %.3f of the best accuracy: %s (%d terms, %.1f kB, accuracy %.3f)",
+                 float(budget), pick['name'], pick['terms'], pick['size_kb'], pick['accuracy'])
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    main(*sys.argv[1:])
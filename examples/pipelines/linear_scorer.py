@@ -0,0 +1,137 @@
+"""
+Compact scorer exported from a fitted CountVectorizer + linear classifier pipeline.
+
+Both MultinomialNB and linear models (LogisticRegression, SGDClassifier, LinearSVC, ...) predict
+argmax(counts @ weights + bias) over the classes. LinearTextScorer keeps only what this needs: the
+vocabulary dict, a dense (vocabulary x classes) weight matrix and the bias. Texts are tokenized with the
+vectorizer's own regex (or its analyzer, for n-grams, stop words etc.) and scored in one NumPy pass
+per batch, without building a sparse matrix or sklearn's input validation.
+
+Scores are accumulated in the same order as scipy's sparse-dense product (per document, features in
+ascending order), so they are bit-identical to the pipeline's and so are the predictions, ties included.
+
+Usage: python linear_scorer.py [pipeline path] [scorer path]
+    exports the pipeline (text_classification_pipeline.joblib by default) and checks its predictions
+"""
+import logging
+import re
+import sys
+from itertools import chain
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+from baseline import DATA, load_test_data, load_train_data
+from feature_selection import compact
+from model_registry import load_artifact, save_artifact
+
+SCORER_PATH = DATA / "text_classification_scorer.model"
+
+
+class LinearTextScorer:
+    """predict(texts) of a CountVectorizer + linear classifier pipeline, see export_scorer."""
+
+    def __init__(self, vocabulary: dict[str, int], weights: np.ndarray, bias: np.ndarray, classes: np.ndarray,
+                 vectorizer_params: dict):
+        self.vocabulary = vocabulary
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)  # (n_features, n_classes)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self.vectorizer_params = vectorizer_params
+        self._init_analyzer()
+
+    def _init_analyzer(self) -> None:
+        params = self.vectorizer_params
+        simple = (params['analyzer'] == 'word' and tuple(params['ngram_range']) == (1, 1)
+                  and params['input'] == 'content' and params['token_pattern'] is not None
+                  and all(params[name] is None for name in ('preprocessor', 'tokenizer', 'stop_words',
+                                                            'strip_accents')))
+        if simple:
+            # What CountVectorizer's analyzer does in this configuration: (lowercase and) find tokens
+            findall = re.compile(params['token_pattern']).findall
+            self._analyze = (lambda text: findall(text.lower())) if params['lowercase'] else findall
+        else:
+            self._analyze = CountVectorizer(**params).build_analyzer()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_analyze']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_analyzer()
+
+    def decision_scores(self, texts: Iterable[str]) -> np.ndarray:
+        """(n_texts, n_classes) scores: token counts @ weights + bias."""
+        get = self.vocabulary.get
+        analyze = self._analyze
+        rows = [[j for j in map(get, analyze(text)) if j is not None] for text in texts]
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        features = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=int(lengths.sum()))
+        n_features = len(self.weights)
+        # Unique (document, feature) pairs sorted like the indices of the CountVectorizer matrix
+        keys, counts = np.unique(np.repeat(np.arange(len(rows)), lengths) * n_features + features,
+                                 return_counts=True)
+        docs, features = np.divmod(keys, n_features)
+        contributions = self.weights[features]
+        if not self.vectorizer_params['binary']:
+            contributions *= counts[:, None]
+
+        # Added one by one in this order, like scipy does (np.add.reduceat would sum pairwise)
+        scores = np.zeros((len(rows), self.weights.shape[1]))
+        np.add.at(scores, docs, contributions)
+        return scores + self.bias
+
+    def predict(self, texts: Iterable[str]) -> np.ndarray:
+        return self.classes_[np.argmax(self.decision_scores(texts), axis=1)]
+
+
+def export_scorer(pipeline: Pipeline) -> LinearTextScorer:
+    """
+    LinearTextScorer of a fitted pipeline of a CountVectorizer and MultinomialNB or a linear classifier,
+    optionally with a feature selector in between (only the selected terms are kept).
+    """
+    steps = [step for _, step in pipeline.steps if step not in (None, 'passthrough')]
+    if len(steps) == 3 and hasattr(steps[1], 'get_support'):
+        steps = [step for _, step in compact(pipeline).steps]
+    if len(steps) != 2 or type(steps[0]) is not CountVectorizer:
+        raise ValueError(f"Expected a CountVectorizer and a classifier, got {steps}")
+    vectorizer, classifier = steps
+    n_features = len(vectorizer.vocabulary_)
+    if isinstance(classifier, MultinomialNB):
+        # MultinomialNB._joint_log_likelihood
+        weights, bias = classifier.feature_log_prob_.T, classifier.class_log_prior_
+    elif hasattr(classifier, 'coef_') and hasattr(classifier, 'intercept_'):
+        # LinearClassifierMixin.decision_function
+        if classifier.coef_.shape[0] == 1:
+            # Binary decision_function > 0, as argmax over (0, score): ties go to classes_[0] as well
+            weights = np.column_stack([np.zeros(n_features), classifier.coef_[0]])
+            bias = np.array([0.0, np.ravel(classifier.intercept_)[0]])
+        else:
+            weights, bias = classifier.coef_.T, np.broadcast_to(classifier.intercept_, len(classifier.classes_))
+    else:
+        raise ValueError(f"Unsupported classifier {classifier!r}")
+    if weights.shape[0] != n_features:
+        raise ValueError(f"Classifier has {weights.shape[0]} features, vocabulary {n_features}")
+    vocabulary = {term: int(index) for term, index in vectorizer.vocabulary_.items()}
+    return LinearTextScorer(vocabulary, weights, bias, classifier.classes_, vectorizer.get_params())
+
+
+def main(pipeline_path: Path = DATA / "text_classification_pipeline.joblib", scorer_path: Path = SCORER_PATH):
+    pipeline = load_artifact(Path(pipeline_path))
+    scorer = export_scorer(pipeline)
+    save_artifact(scorer, Path(scorer_path))
+    scorer = load_artifact(Path(scorer_path))
+    texts = load_train_data()[0] + load_test_data()[0]
+    identical = np.array_equal(scorer.predict(texts), pipeline.predict(texts))
+    logging.info("Predictions on %d texts identical to the pipeline: %s", len(texts), identical)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    main(*sys.argv[1:3])
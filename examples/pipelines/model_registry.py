@@ -0,0 +1,119 @@
+"""
+Model artifacts on disk and a per-process cache of loaded models.
+
+Artifacts are pickles (protocol 5) whose large numpy arrays (feature_log_prob_, coef_, idf_, ...) are
+stored out-of-band after the pickle stream, 64-byte aligned. Loading with mmap_mode='r' maps the file
+and hands the arrays views of the mapping: nothing is copied, and all processes mapping the same
+file (e.g. pre-forked gunicorn workers) share one copy in the page cache. The pickle stream itself
+goes through the C unpickler, unlike joblib's mmap_mode, whose Python unpickler is slow on the large
+vocabulary dicts of text vectorizers.
+
+File layout: MAGIC, uint64 number of buffers, (uint64 offset, uint64 size) of the pickle stream and
+of every buffer, then the pickle stream and the buffers.
+
+Paths ending with .joblib are written and read with joblib (uncompressed, mmap_mode) instead, for
+artifacts consumed by other code, e.g. the pipeline served by examples/project_structure.
+
+Loaded models are cached per process by path and reloaded when the file version (mtime, size)
+changes. save_artifact replaces files atomically, so a reader sees either the old or the new model.
+"""
+import logging
+import mmap
+import os
+import pickle
+import struct
+import threading
+from pathlib import Path
+
+import joblib
+
+MAGIC = b"MODELv1\0"
+ALIGNMENT = 64
+
+_cache = {}  # (resolved path, mmap_mode) -> (version, model)
+_lock = threading.Lock()
+
+
+def artifact_version(path: Path) -> tuple[int, int]:
+    stat = Path(path).stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_artifact(obj: object, path: Path) -> None:
+    """Saves an object with its numpy arrays out-of-band (memory-mappable), replacing path atomically."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    if path.suffix == ".joblib":
+        joblib.dump(obj, tmp)
+    else:
+        _write(obj, tmp)
+    os.replace(tmp, path)
+    logging.info(f"Saved object to {path}")
+
+
+def _write(obj: object, path: Path) -> None:
+    buffers = []
+    stream = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    chunks = [memoryview(stream)] + [buffer.raw() for buffer in buffers]
+    table = []
+    offset = _align(len(MAGIC) + 8 + 16 * len(chunks))
+    for chunk in chunks:
+        table.append((offset, chunk.nbytes))
+        offset = _align(offset + chunk.nbytes)
+
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(buffers)))
+        f.write(b"".join(struct.pack("<QQ", *entry) for entry in table))
+        for (start, _), chunk in zip(table, chunks):
+            f.write(b"\0" * (start - f.tell()))
+            f.write(chunk)
+
+
+def _read(path: Path, mmap_mode) -> object:
+    if path.suffix == ".joblib":
+        return joblib.load(path, mmap_mode=mmap_mode)
+    with open(path, "rb") as f:
+        if mmap_mode == 'r':
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        elif mmap_mode is None:
+            data = memoryview(bytearray(f.read()))  # writable copy, arrays can be modified
+        else:
+            raise ValueError(f"Unsupported mmap_mode {mmap_mode!r}, use 'r' or None")
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a model artifact")
+    (n_buffers,) = struct.unpack_from("<Q", data, len(MAGIC))
+    table = [struct.unpack_from("<QQ", data, len(MAGIC) + 8 + 16 * i) for i in range(n_buffers + 1)]
+    chunks = [data[start:start + size] for start, size in table]
+    return pickle.loads(chunks[0], buffers=chunks[1:])
+
+
+def load_artifact(path: Path, mmap_mode: str = 'r') -> object:
+    """
+    Loads an artifact, or returns the one already loaded with the same mmap_mode if the file did not change.
+    Numpy arrays are read-only views of the memory-mapped file unless mmap_mode is None.
+    """
+    path = Path(path).resolve()
+    version = artifact_version(path)
+    with _lock:
+        cached = _cache.get((path, mmap_mode))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    model = _read(path, mmap_mode)
+    with _lock:
+        _cache[path, mmap_mode] = (version, model)
+    return model
+
+
+def preload(*paths: Path) -> None:
+    """Loads artifacts before workers fork (gunicorn preload_app), the children inherit the cache."""
+    for path in paths:
+        load_artifact(path)
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
@@ -1,20 +1,27 @@
 import logging
 from pathlib import Path
+from typing import Iterable, Sequence
+
 from sklearn.pipeline import Pipeline
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.metrics import classification_report, accuracy_score
-from joblib import dump, load
 
-from baseline import load_train_data, load_test_data, DATA
+from baseline import load_train_data, load_test_data, DATA, STORE
+from evaluation import evaluate_cached, log_evaluation
+from experiment_store import ExperimentStore, StageTimer, fingerprint_data, fingerprint_estimator
+from model_registry import load_artifact, save_artifact
 
 PIPELINE_PATH = DATA / "text_classification_pipeline.joblib"
 
 
-def create_pipeline() -> Pipeline:
-    """Creates a text classification pipeline."""
+def create_pipeline(selector=None) -> Pipeline:
+    """Creates a text classification pipeline.
+
+    With selector (e.g. SelectKBest, see feature_selection), only the selected terms reach the classifier.
+    """
     return Pipeline([
         ('vectorizer', CountVectorizer()),  # Step 1: Vectorize text
+        *([('selector', selector)] if selector is not None else []),  # Optionally keep the informative terms
         ('classifier', MultinomialNB())    # Step 2: Train the classifier
     ])
 
@@ -22,29 +29,61 @@ def create_pipeline() -> Pipeline:
 def train_model(pipeline: Pipeline, texts: list[str], labels: list[int], save_path: Path = PIPELINE_PATH) -> None:
     """Trains the pipeline and saves it."""
     pipeline.fit(texts, labels)
-    dump(pipeline, save_path)
-    logging.info(f"Pipeline saved to {save_path}")
+    save_artifact(pipeline, save_path)
 
 
-def eval_model(pipeline: Pipeline, texts: list[str], labels: list[int]) -> None:
-    """Evaluates the pipeline on test data."""
-    y_pred = pipeline.predict(texts)
-    logging.info("Accuracy: %s", accuracy_score(labels, y_pred))
-    logging.info("\nClassification Report:\n%s", classification_report(labels, y_pred))
+def eval_model(pipeline: Pipeline, texts: Iterable[str], labels: Iterable[int], batch_size: int = 1000,
+               n_jobs: int = 1, store: ExperimentStore | None = None) -> None:
+    """
+    Evaluates the pipeline on test data, streamed in batches of batch_size (see evaluation.evaluate).
+    With a store, the results of an unchanged pipeline on unchanged test data are reused.
+    """
+    log_evaluation(evaluate_cached(pipeline, texts, labels, store, batch_size=batch_size, n_jobs=n_jobs))
 
 
-def experiment():
+def experiment(pipeline=None, train_data=None, save_path: Path = PIPELINE_PATH,
+               store: ExperimentStore | None = STORE):
+    """
+    Trains, saves, reloads and evaluates a pipeline.
+    Args:
+        pipeline: Estimator to train, create_pipeline() by default.
+        train_data: (texts, labels) passed to pipeline.fit, load_train_data() by default. Streaming
+            estimators (pipelines_streaming) accept iterables read lazily from files.
+        save_path: Where the trained pipeline is saved.
+        store: Experiment store, when training data, pipeline parameters and library versions are the same
+            as in an earlier run, its fitted pipeline and evaluation results are reused. None always retrains.
+            Training data that are not sequences (e.g. generators) cannot be fingerprinted and are always trained.
+    """
+    timer = StageTimer()
     logging.info("Loading training and test data...")
-    train_texts, train_labels = load_train_data()
-    test_texts, test_labels = load_test_data()
+    with timer('load data'):
+        train_texts, train_labels = train_data if train_data is not None else load_train_data()
+        test_texts, test_labels = load_test_data()
+    pipeline = pipeline if pipeline is not None else create_pipeline()
+
+    key = None
+    if store is not None and isinstance(train_texts, Sequence) and isinstance(train_labels, Sequence):
+        with timer('fingerprint'):
+            key = store.key('pipeline', fingerprint_data(train_texts, train_labels), fingerprint_estimator(pipeline))
+    artifact = 'pipeline' + save_path.suffix
 
-    logging.info("Traíning the model...")
-    pipeline = create_pipeline()
-    train_model(pipeline, train_texts, train_labels)
+    if key is not None and store.has_artifacts(key, artifact):
+        logging.info("Unchanged training data and pipeline, reusing %s", store.run_dir(key))
+        store.export_artifact(key, artifact, save_path)
+    else:
+        logging.info("Traíning the model...")
+        with timer('train'):
+            path = save_path if key is None else store.artifact_path(key, artifact)
+            train_model(pipeline, train_texts, train_labels, path)
+        if key is not None:
+            store.export_artifact(key, artifact, save_path)
+            store.save_results(key, 'training', {'pipeline': repr(pipeline), 'timings': timer})
 
     logging.info("Evaluating the model...")
-    loaded_pipeline = load(PIPELINE_PATH)
-    eval_model(loaded_pipeline, test_texts, test_labels)
+    with timer('evaluate'):
+        loaded_pipeline = load_artifact(save_path)
+        eval_model(loaded_pipeline, test_texts, test_labels, store=store)
+    logging.info("Stages: %s", timer.summary())
 
 
 if __name__ == '__main__':
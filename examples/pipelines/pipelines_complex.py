@@ -2,7 +2,7 @@ import logging
 from sklearn.pipeline import Pipeline, FeatureUnion
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.preprocessing import FunctionTransformer, MinMaxScaler
+from sklearn.preprocessing import MaxAbsScaler
 
 from baseline import DATA
 from pipelines_basic import experiment
@@ -10,22 +10,22 @@ from pipelines_basic import experiment
 PIPELINE_PATH = DATA / "text_classification_pipeline.joblib"
 
 
-def create_pipeline() -> Pipeline:
-    """Creates a text classification pipeline with multiple vectorizers."""
+def create_pipeline(selector=None) -> Pipeline:
+    """Creates a text classification pipeline with multiple vectorizers.
+
+    With selector (e.g. SelectKBest, see feature_selection), only the selected features reach the classifier.
+    """
     # Define the feature extraction with two vectorizers
     feature_union = FeatureUnion([
         ('count_vectorizer', CountVectorizer()),  # Step 1a: Count vectorizer
         ('tfidf_vectorizer', TfidfVectorizer())   # Step 1b: TF-IDF vectorizer
     ])
 
-    # Add a FunctionTransformer to convert sparse to dense before scaling
-    dense_transformer = FunctionTransformer(lambda x: x.toarray(), accept_sparse=True)
-
     # Define the full pipeline
     pipeline = Pipeline([
         ('features', feature_union),                     # Merge vectorized outputs
-        ('to_dense', dense_transformer),                 # Convert sparse to dense
-        ('scaler', MinMaxScaler()),                    # Scale the features
+        ('scaler', MaxAbsScaler()),                      # Scale the features, keeps the matrix sparse
+        *([('selector', selector)] if selector is not None else []),  # Optionally keep the informative features
         ('classifier', MultinomialNB())                 # Train the classifier
     ])
     return pipeline
@@ -1,58 +1,87 @@
+"""
+Grid search over vectorizer settings and classifiers.
+
+Modes (python pipelines_gridsearch.py [mode] [--pruning]):
+    grid     GridSearchCV, fitted transformer steps cached across candidates, candidates run on all cores
+    halving  HalvingGridSearchCV (successive halving), cached and parallel as well
+    resume   grid search whose candidate scores are kept in the experiment store: candidates evaluated
+             by an earlier (possibly interrupted) run on the same data are skipped
+    compare  wall-clock time of the plain single-process GridSearchCV next to both modes above
+
+With --pruning, feature pruning settings (min_df, chi2 feature selection) are searched as well.
+"""
+import argparse
 import logging
-
+import sys
+import time
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from joblib import Memory, Parallel, delayed
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401, enables HalvingGridSearchCV
+from sklearn.feature_selection import SelectPercentile, chi2
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import GridSearchCV
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, ParameterGrid, cross_val_score
 from sklearn.pipeline import Pipeline, FeatureUnion
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
 from sklearn.naive_bayes import MultinomialNB
-from sklearn.preprocessing import FunctionTransformer, MinMaxScaler
+from sklearn.preprocessing import MaxAbsScaler
 
-from baseline import DATA, load_train_data, load_test_data
+from baseline import DATA, STORE, load_train_data, load_test_data
+from experiment_store import ExperimentStore, StageTimer, fingerprint_data, fingerprint_estimator
 from pipelines_basic import experiment, eval_model
 
 PIPELINE_PATH = DATA / "text_classification_pipeline.joblib"
 
 
-def create_pipeline() -> Pipeline:
-    """Creates a text classification pipeline with multiple vectorizers."""
+def create_pipeline(memory=None, selector=None) -> Pipeline:
+    """Creates a text classification pipeline with multiple vectorizers.
+
+    With memory (a joblib.Memory or a directory), fitted transformer steps are cached, so candidates that
+    differ only in later steps (scaler, classifier) reuse the fitted vectorizers.
+    With selector (e.g. SelectKBest, see feature_selection), only the selected features reach the classifier;
+    'passthrough' keeps a selector step that create_param_grid() can set.
+    """
     # Define the feature extraction with two vectorizers
     feature_union = FeatureUnion([
         ('count_vectorizer', CountVectorizer()),  # Step 1a: Count vectorizer
         ('tfidf_vectorizer', TfidfVectorizer())   # Step 1b: TF-IDF vectorizer
     ])
 
-    # Add a FunctionTransformer to convert sparse to dense before scaling
-    dense_transformer = FunctionTransformer(lambda x: x.toarray(), accept_sparse=True)
-
     # Define the full pipeline
     pipeline = Pipeline([
         ('features', feature_union),                     # Merge vectorized outputs
-        ('to_dense', dense_transformer),                 # Convert sparse to dense
-        ('scaler', MinMaxScaler()),                    # Scale the features
+        ('scaler', MaxAbsScaler()),                      # Scale the features, keeps the matrix sparse
+        *([('selector', selector)] if selector is not None else []),  # Optionally keep the informative features
         ('classifier', MultinomialNB())                 # Train the classifier
-    ])
+    ], memory=memory)
     return pipeline
 
 
-if __name__ == '__main__':
-    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
-
-    logging.info("Loading training and test data...")
-    train_texts, train_labels = load_train_data()
-    test_texts, test_labels = load_test_data()
-
-    logging.info("Creating the pipeline...")
-    pipeline = create_pipeline()
-
-    # Define the parameter grid
+def create_param_grid(pruning: bool = False) -> list[dict]:
+    """
+    Grid for a pipeline of create_pipeline(selector='passthrough'). With pruning, feature pruning settings
+    are searched as well, which makes the grid four times larger.
+    """
     base_param_grid = {
         'features__count_vectorizer__max_features': [500, 1000],
         'features__tfidf_vectorizer__max_features': [500, 1000],
         'features__count_vectorizer__ngram_range': [(1, 1), (1, 2)],
         'features__tfidf_vectorizer__ngram_range': [(1, 1), (1, 2)],
-        'scaler': [MinMaxScaler(), None]  # Try with and without scaling
+        'scaler': [MaxAbsScaler(), None]  # Try with and without scaling
     }
 
+    # Feature pruning (see feature_selection): none, terms in less than 1% of the documents dropped, or the
+    # best features by chi2. Relative to the data, so pruning never asks for more terms than the folds have.
+    pruning_grids = [{}]
+    if pruning:
+        pruning_grids += [
+            {'features__count_vectorizer__min_df': [0.01], 'features__tfidf_vectorizer__min_df': [0.01]},
+            {'selector': [SelectPercentile(chi2)], 'selector__percentile': [25, 50]},
+        ]
+
     # Classifier-specific grids
     classifiers = [
         (MultinomialNB(), {'classifier__alpha': [0.1, 1.0]}),
@@ -61,13 +90,147 @@ if __name__ == '__main__':
 
     param_grid = []
     for classifier, classifier_params in classifiers:
-        grid = {**base_param_grid, 'classifier': [classifier], **classifier_params}
-        param_grid.append(grid)
+        for pruning_params in pruning_grids:
+            grid = {**base_param_grid, **pruning_params, 'classifier': [classifier], **classifier_params}
+            param_grid.append(grid)
+    return param_grid
+
+
+class StoredSearch:
+    """Results of resumable_search, with the attributes of GridSearchCV used in this module."""
+
+    def __init__(self, params: list[dict], scores: list[list[float]], best_estimator, n_reused: int):
+        mean = np.mean(scores, axis=1)
+        # Ranked like GridSearchCV: candidates with failed fits (NaN scores) come last
+        rank = rankdata(-np.nan_to_num(mean, nan=np.nanmin(mean, initial=0) - 1), method='min').astype(np.int32)
+        self.cv_results_ = {'params': params, 'mean_test_score': mean, 'std_test_score': np.std(scores, axis=1),
+                            'rank_test_score': rank}
+        self.best_index_ = int(rank.argmin())
+        self.best_params_ = params[self.best_index_]
+        self.best_score_ = float(self.cv_results_['mean_test_score'][self.best_index_])
+        self.best_estimator_ = best_estimator
+        self.n_splits_ = len(scores[0])
+        self.n_reused_ = n_reused
+
+
+def _candidate(pipeline: Pipeline, params: dict) -> Pipeline:
+    # Parameter values are cloned like in GridSearchCV: candidates share the estimator instances of the grid
+    return clone(pipeline).set_params(**clone(params, safe=False))
+
+
+def _cross_validate(index: int, pipeline: Pipeline, texts, labels, cv: int, scoring: str):
+    start = time.perf_counter()
+    scores = cross_val_score(pipeline, texts, labels, cv=cv, scoring=scoring)
+    return index, scores.tolist(), time.perf_counter() - start
+
+
+def resumable_search(texts: list[str], labels: list[int], store: ExperimentStore = STORE, cv: int = 3,
+                     scoring: str = 'f1_macro', n_jobs: int = -1, pruning: bool = False) -> StoredSearch:
+    """
+    Exhaustive search over create_param_grid(pruning) like GridSearchCV, but every candidate's fold scores are
+    saved to the store as soon as they are known, keyed by the data, the candidate pipeline, cv and scoring.
+    Candidates already in the store are not fitted again, so an interrupted search resumes where it
+    stopped, and a finished one only refits its best candidate (which is stored as well).
+    """
+    timer = StageTimer()
+    # Fitted transformers are cached on disk across runs as well
+    pipeline = create_pipeline(memory=Memory(store.root / "transformers", verbose=0), selector='passthrough')
+    candidates = list(ParameterGrid(create_param_grid(pruning)))
+    with timer('fingerprint'):
+        data = fingerprint_data(texts, labels)
+        keys = [store.key('cv', data, fingerprint_estimator(_candidate(pipeline, params)), cv, scoring)
+                for params in candidates]
+
+    scores = [(store.load_results(key, 'cv') or {}).get('scores') for key in keys]
+    missing = [i for i, candidate_scores in enumerate(scores)
+               if candidate_scores is None or np.isnan(candidate_scores).any()]
+    logging.info("%d of %d candidates found in the store, evaluating %d",
+                 len(candidates) - len(missing), len(candidates), len(missing))
+    with timer('cross-validation'):
+        jobs = (delayed(_cross_validate)(i, _candidate(pipeline, candidates[i]), texts, labels, cv, scoring)
+                for i in missing)
+        for done, (i, candidate_scores, elapsed) in enumerate(
+                Parallel(n_jobs=n_jobs, return_as='generator_unordered')(jobs), 1):
+            scores[i] = candidate_scores
+            if np.isnan(candidate_scores).any():
+                # A failed fit is not a result, the candidate is evaluated again by the next run
+                logging.warning("Candidate %s failed in %d of %d folds", candidates[i],
+                                np.isnan(candidate_scores).sum(), len(candidate_scores))
+                continue
+            store.save_results(keys[i], 'cv', {'params': candidates[i], 'scores': candidate_scores,
+                                               'seconds': elapsed})
+            logging.debug("Candidate %d/%d: %.3f", done, len(missing), np.mean(candidate_scores))
+
+    result = StoredSearch(candidates, scores, None, len(candidates) - len(missing))
+    best = _candidate(pipeline, result.best_params_).set_params(memory=None)
+    with timer('refit'):
+        key = store.key('pipeline', data, fingerprint_estimator(best))
+        if store.has_artifacts(key, 'pipeline'):
+            best = store.load_artifact(key, 'pipeline')
+        else:
+            best.fit(texts, labels)
+            store.save_artifact(key, 'pipeline', best)
+    result.best_estimator_ = best
+    logging.info("Search stages: %s", timer.summary())
+    return result
+
+
+def search(texts: list[str], labels: list[int], mode: str = 'grid', cached: bool = True, n_jobs: int = -1,
+           verbose: int = 0, pruning: bool = False):
+    """Fits a grid search ('grid', 'halving' or 'resume') and returns it with its wall-clock time in seconds."""
+    if mode == 'resume':
+        start = time.perf_counter()
+        result = resumable_search(texts, labels, n_jobs=n_jobs, pruning=pruning)
+        return result, time.perf_counter() - start
+
+    with TemporaryDirectory() as cache_dir:
+        pipeline = create_pipeline(memory=Memory(cache_dir, verbose=0) if cached else None, selector='passthrough')
+        if mode == 'halving':
+            grid_search = HalvingGridSearchCV(pipeline, create_param_grid(pruning), cv=3, scoring='f1_macro', factor=3,
+                                              n_jobs=n_jobs, verbose=verbose, random_state=0)
+        else:
+            grid_search = GridSearchCV(pipeline, create_param_grid(pruning), cv=3, scoring='f1_macro',
+                                       n_jobs=n_jobs, verbose=verbose)
+        start = time.perf_counter()
+        grid_search.fit(texts, labels)
+        elapsed = time.perf_counter() - start
+        # The cache directory is removed below, the best estimator must not refer to it
+        grid_search.best_estimator_.set_params(memory=None)
+    return grid_search, elapsed
+
+
+def compare(texts: list[str], labels: list[int], pruning: bool = False) -> None:
+    """Logs wall-clock time, number of fits and best score of the search variants."""
+    runs = [
+        ('grid, no cache, 1 process', dict(mode='grid', cached=False, n_jobs=1)),
+        ('grid, cached, all cores', dict(mode='grid')),
+        ('halving, cached, all cores', dict(mode='halving')),
+    ]
+    logging.info("%-28s %10s %8s %10s", "search", "time [s]", "fits", "best f1")
+    for name, kwargs in runs:
+        grid_search, elapsed = search(texts, labels, pruning=pruning, **kwargs)
+        n_fits = len(grid_search.cv_results_['params']) * grid_search.n_splits_
+        logging.info("%-28s %10.2f %8d %10.3f", name, elapsed, n_fits, grid_search.best_score_)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Grid search over vectorizer settings and classifiers.")
+    parser.add_argument('mode', nargs='?', default='grid', choices=['grid', 'halving', 'resume', 'compare'])
+    parser.add_argument('--pruning', action='store_true', help="search feature pruning settings as well")
+    args = parser.parse_args()
+
+    logging.info("Loading training and test data...")
+    train_texts, train_labels = load_train_data()
+    test_texts, test_labels = load_test_data()
+
+    if args.mode == 'compare':
+        compare(train_texts, train_labels, pruning=args.pruning)
+        sys.exit()
 
-    # Grid search
-    grid_search = GridSearchCV(pipeline, param_grid, cv=3, scoring='f1_macro', verbose=3)
-    logging.info("Performing grid search...")
-    grid_search.fit(train_texts, train_labels)
+    logging.info("Performing %s search...", args.mode)
+    grid_search, elapsed = search(train_texts, train_labels, mode=args.mode, verbose=1, pruning=args.pruning)
+    logging.info("Search took %.2f s", elapsed)
 
     # Best parameters and evaluation
     logging.info(f"Best parameters: {grid_search.best_params_}")
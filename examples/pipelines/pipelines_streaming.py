@@ -0,0 +1,117 @@
+"""
+Out-of-core training: texts are read from files in chunks, vectorized by a stateless HashingVectorizer
+(no vocabulary is kept) and learned by partial_fit mini-batches, so memory stays flat however
+large the corpus is.
+
+Corpus files have one document per line: "<label>\t<text>".
+
+Usage: python pipelines_streaming.py [nb|sgd] [corpus files...] [--batch-size N]
+    without corpus files, the baseline training data is written to DATA/train_corpus.tsv and used;
+    N documents (default 1000) are vectorized and learned per partial_fit call
+"""
+import argparse
+import logging
+from itertools import tee
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+
+from baseline import DATA, load_train_data
+from evaluation import batches
+from pipelines_basic import experiment
+
+STREAMING_PIPELINE_PATH = DATA / "streaming_classifier.model"
+
+CLASSIFIERS = {
+    'nb': lambda: MultinomialNB(alpha=0.1),
+    'sgd': lambda: SGDClassifier(loss='log_loss', random_state=0),
+}
+
+
+class StreamingTextClassifier(BaseEstimator, ClassifierMixin):
+    """
+    HashingVectorizer + partial_fit classifier (MultinomialNB or SGDClassifier).
+
+    fit consumes texts and labels as iterables in batches of batch_size, they may be generators
+    reading from disk. All classes must be known up front, a batch does not have to contain them all.
+    """
+
+    def __init__(self, classes=(0, 1), classifier='nb', n_features=2 ** 20, batch_size=10_000, n_epochs=1):
+        self.classes = classes
+        self.classifier = classifier
+        self.n_features = n_features
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+
+    def _vectorizer(self):
+        # Counts must stay non-negative for MultinomialNB, hence no alternating signs
+        return HashingVectorizer(n_features=self.n_features, alternate_sign=False, norm='l2')
+
+    def _reset(self):
+        self.vectorizer_ = self._vectorizer()
+        self.classifier_ = CLASSIFIERS[self.classifier]()
+        self.n_samples_seen_ = 0
+
+    def fit(self, X: Iterable[str], y: Iterable):
+        """Fits from scratch. With n_epochs > 1, X and y must be re-iterable (e.g. lists, not generators)."""
+        self._reset()
+        for _ in range(self.n_epochs):
+            for texts, labels in batches(X, y, self.batch_size):
+                self.partial_fit(texts, labels)
+        return self
+
+    def partial_fit(self, X: list[str], y: list):
+        """Learns one mini-batch."""
+        if not hasattr(self, 'classifier_'):
+            self._reset()
+        self.classifier_.partial_fit(self.vectorizer_.transform(X), y, classes=list(self.classes))
+        self.n_samples_seen_ += len(X)
+        self.classes_ = self.classifier_.classes_
+        return self
+
+    def predict(self, X: Iterable[str]):
+        return self.classifier_.predict(self.vectorizer_.transform(X))
+
+
+def iter_corpus(paths: Iterable[Path]) -> Iterator[tuple[str, int]]:
+    """(text, label) for every line of the corpus files, read lazily."""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                label, _, text = line.rstrip('\n').partition('\t')
+                if text:
+                    yield text, int(label)
+
+
+def read_corpus(paths: Iterable[Path]) -> tuple[Iterator[str], Iterator[int]]:
+    """Texts and labels of the corpus files as two lazy iterators, to be consumed in lockstep (zip)."""
+    texts, labels = tee(iter_corpus(paths))
+    return (text for text, _ in texts), (label for _, label in labels)
+
+
+def write_corpus(path: Path, texts: Iterable[str], labels: Iterable[int]) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        for text, label in zip(texts, labels):
+            f.write(f"{label}\t{' '.join(text.split())}\n")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Out-of-core training of the text classifier.")
+    parser.add_argument('classifier', nargs='?', default='nb', choices=sorted(CLASSIFIERS))
+    parser.add_argument('corpus_files', nargs='*', type=Path)
+    parser.add_argument('--batch-size', type=int, default=1000, help="Documents per partial_fit call")
+    args = parser.parse_args()
+    corpus_files = args.corpus_files
+    if not corpus_files:
+        corpus_files = [DATA / "train_corpus.tsv"]
+        write_corpus(corpus_files[0], *load_train_data())
+
+    # Imported by module name, so that the saved model refers to pipelines_streaming, not __main__
+    from pipelines_streaming import StreamingTextClassifier
+    experiment(StreamingTextClassifier(classifier=args.classifier, batch_size=args.batch_size),
+               train_data=read_corpus(corpus_files), save_path=STREAMING_PIPELINE_PATH)
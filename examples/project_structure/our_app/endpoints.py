@@ -1,17 +1,42 @@
-from fastapi import FastAPI, Request
+from contextlib import asynccontextmanager
+from typing import Optional
 
-from services.dummy_service import dummy_result
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
 
-app = FastAPI()
+from services.inference import InferenceService
+
+inference = InferenceService()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Every worker process loads the model once
+    await inference.start()
+    yield
+    await inference.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class SolverInput(BaseModel):
+    text: Optional[str] = None
+    texts: Optional[list[str]] = None
 
 
 @app.post("/v1/solver")
-async def resolve(input: Request):
+async def resolve(input: SolverInput):
     """Solve the task.
 
     Args:
-        input: Task input. Document?
+        input: Task input, a single document ("text") or a batch of documents ("texts").
 
-    Returns: Task output.
+    Returns: Task output, the predicted label, or the list of labels for a batch.
     """
-    return dummy_result()
+    if (input.text is None) == (input.texts is None):
+        raise HTTPException(status_code=422, detail='Send either "text" or "texts"')
+    if input.text is not None:
+        labels = await inference.predict([input.text])
+        return {"status": "ok", "result": labels[0]}
+    return {"status": "ok", "result": await inference.predict(input.texts)}
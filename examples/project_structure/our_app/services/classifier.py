@@ -9,6 +9,9 @@ make minimal code comments, focus on modularity and code quality
 check code is working
 """
 import pickle
+from collections import deque
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
 
 import spacy
@@ -20,24 +23,101 @@ from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report
 
+from services.lemma_cache import get_lemma_cache, lemma_key
 
-try:
-    nlp = spacy.load('en_core_web_sm', disable=['parser', 'ner'])
-except OSError:
-    from spacy.cli import download
-    download('en_core_web_sm')
-    nlp = spacy.load('en_core_web_sm', disable=['parser', 'ner'])
+
+MODEL_NAME = 'en_core_web_sm'
+
+
+@lru_cache(maxsize=None)
+def load_nlp(model_name=MODEL_NAME):
+    """Load a spaCy model once per process (downloading it if missing), only the lemmatizer is needed."""
+    try:
+        return spacy.load(model_name, disable=['parser', 'ner'])
+    except OSError:
+        from spacy.cli import download
+        download(model_name)
+        return spacy.load(model_name, disable=['parser', 'ner'])
 
 
 class SpacyLemmatizer(BaseEstimator, TransformerMixin):
-    def __init__(self):
-        self.nlp = nlp
+    """Lemmatize documents with spaCy, streaming them through nlp.pipe in batches.
+
+    The spaCy model is not part of the pickled state, it is loaded lazily in every process that uses
+    the transformer, so fitted pipelines stay small and picklable (joblib, n_process > 1, GridSearchCV n_jobs).
+    """
+
+    def __init__(self, model_name=MODEL_NAME, batch_size=256, n_process=1, cache_size=100_000, cache_path=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+
+    @property
+    def nlp(self):
+        return load_nlp(self.model_name)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('nlp', None)  # pickles of older versions stored the loaded model
+        return state
+
+    def __setstate__(self, state):
+        state.pop('nlp', None)
+        self.__dict__.update(state)
 
     def fit(self, X, y=None):
         return self
 
+    @property
+    def cache(self):
+        """Process-wide lemma cache (None when cache_size is 0 and there is no cache_path)."""
+        if not self.cache_size and not self.cache_path:
+            return None
+        return get_lemma_cache(self.cache_size, self.cache_path)
+
+    def _lemmatize(self, texts):
+        for doc in self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process):
+            yield ' '.join(token.lemma_ for token in doc)
+
+    def iter_lemmas(self, X):
+        """Generator of lemmatized documents, X can be any iterable of texts.
+
+        Documents found in the lemma cache skip spaCy, the rest goes through a single nlp.pipe call
+        and the output keeps the input order. Without a cache miss spaCy is not loaded at all.
+        """
+        cache = self.cache
+        if cache is None:
+            yield from self._lemmatize(X)
+            return
+
+        pending = deque()  # (key, cached lemmas or None) for every text read from X, in order
+
+        def misses():
+            for text in X:
+                key = lemma_key(self.model_name, text)
+                lemmas = cache.get(key)
+                pending.append((key, lemmas))
+                if lemmas is None:
+                    yield text
+
+        try:
+            texts = misses()
+            first = next(texts, None)  # reads X up to the first cache miss
+            for lemmas in self._lemmatize(chain([first], texts)) if first is not None else ():
+                while pending[0][1] is not None:
+                    yield pending.popleft()[1]
+                key, _ = pending.popleft()
+                cache.set(key, lemmas)
+                yield lemmas
+            while pending:
+                yield pending.popleft()[1]
+        finally:
+            cache.flush()
+
     def transform(self, X):
-        return [' '.join([token.lemma_ for token in self.nlp(doc)]) for doc in X]
+        return list(self.iter_lemmas(X))
 
 
 def train(X_train, y_train):
@@ -74,3 +154,4 @@ if __name__ == '__main__':
 
     y_pred = model.predict(X_test)
     print(classification_report(y_test, y_pred))
+    print("Lemma cache:", model.named_steps['lemmatizer'].cache.stats())
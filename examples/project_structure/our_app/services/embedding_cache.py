@@ -0,0 +1,110 @@
+"""
+Persistent, content addressed cache of text embeddings.
+
+Embeddings of one model live in <directory>/<model name>/:
+    keys.bin     SHA-1 digests of the texts, 20 bytes per row, append only
+    vectors.bin  raw float32/float16 matrix (rows x dim), memory-mapped for reading
+    meta.json    dim and dtype
+
+Rows are appended vectors first, keys second, so an interrupted write leaves at most unreferenced
+vector bytes and a partial key, both truncated on the next open. Meant for a single writer process.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+DIGEST_SIZE = 20
+
+
+def text_digest(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, directory, model_name, dtype="float32"):
+        self.path = Path(directory) / re.sub(r"[^\w.-]+", "_", model_name)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.keys_path = self.path / "keys.bin"
+        self.vectors_path = self.path / "vectors.bin"
+        self.meta_path = self.path / "meta.json"
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+        if self.meta_path.is_file():
+            meta = json.loads(self.meta_path.read_text())
+            self.dim, self.dtype = meta["dim"], np.dtype(meta["dtype"])
+        self._load()
+
+    def _load(self):
+        keys = self.keys_path.read_bytes() if self.keys_path.is_file() else b""
+        # Without meta.json (written before the first row) there are no complete rows
+        count = len(keys) // DIGEST_SIZE if self.dim is not None else 0
+        row_bytes = (self.dim or 0) * self.dtype.itemsize
+        for path, size in [(self.keys_path, count * DIGEST_SIZE), (self.vectors_path, count * row_bytes)]:
+            if path.is_file() and path.stat().st_size > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+        self._rows = {keys[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]: i for i in range(count)}
+        self._vectors = None
+        if count:
+            self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(count, self.dim))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def lookup(self, digests):
+        """Row number in the cache for every digest, -1 when missing."""
+        return np.array([self._rows.get(d, -1) for d in digests], dtype=np.int64)
+
+    def get(self, rows):
+        """Embeddings of the given cache rows as a float32 array."""
+        return np.asarray(self._vectors[rows], dtype=np.float32)
+
+    def add(self, digests, embeddings):
+        """Append embeddings for digests not in the cache yet."""
+        embeddings = np.asarray(embeddings)
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+            self.meta_path.write_text(json.dumps({"dim": self.dim, "dtype": self.dtype.name}))
+        new = [i for i, d in enumerate(digests) if d not in self._rows]
+        new = list({digests[i]: i for i in new}.values())  # a text repeated within the batch is stored once
+        if not new:
+            return
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(embeddings[new], dtype=self.dtype).tobytes())
+        with open(self.keys_path, "ab") as f:
+            f.write(b"".join(digests[i] for i in new))
+        self._load()
+
+
+class CachedRows:
+    """
+    Rows of an EmbeddingCache as a read-only float32 matrix that stays on disk: indexing reads only the
+    requested rows from the memory-mapped vectors, np.asarray() reads all of them.
+    """
+
+    def __init__(self, cache, rows):
+        self.cache = cache
+        self.rows = np.asarray(rows, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def shape(self):
+        return len(self.rows), self.cache.dim
+
+    @property
+    def nbytes(self):
+        """Memory held by this object (the row numbers), not by the rows on disk."""
+        return self.rows.nbytes
+
+    def __getitem__(self, index):
+        return self.cache.get(self.rows[index])
+
+    def __array__(self, dtype=None, copy=None):
+        return self.cache.get(self.rows).astype(dtype or np.float32, copy=False)
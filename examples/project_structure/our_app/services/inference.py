@@ -0,0 +1,147 @@
+"""
+Text classification inference with micro-batching.
+
+Concurrent requests are queued and coalesced into one batch of up to max_batch_size texts, waiting at
+most max_wait_ms for more requests, so the vectorizer and classifier run on a matrix instead of one
+text at a time. The model is loaded once per worker process.
+
+Settings (environment):
+    MODEL_PATH              joblib pipeline, text_classification_pipeline.joblib from examples/pipelines
+    SOLVER_MAX_BATCH_SIZE   default 64 (1 disables batching)
+    SOLVER_MAX_WAIT_MS      default 5
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MODEL_PATH = Path(os.environ.get(
+    "MODEL_PATH", Path(__file__).parents[2] / "data" / "text_classification_pipeline.joblib"
+))
+MAX_BATCH_SIZE = int(os.environ.get("SOLVER_MAX_BATCH_SIZE", 64))
+MAX_WAIT_MS = float(os.environ.get("SOLVER_MAX_WAIT_MS", 5))
+
+
+def load_model(path=MODEL_PATH):
+    path = Path(path)
+    if not path.is_file():
+        raise FileNotFoundError(f"{path} not found, train it with examples/pipelines/pipelines_basic.py "
+                                f"or set MODEL_PATH")
+    # Numpy arrays stay memory-mapped, workers loading the same file share them in the page cache
+    model = joblib.load(path, mmap_mode="r")
+    logger.info("Loaded model from %s", path)
+    return model
+
+
+class MicroBatcher:
+    """Coalesces concurrent predict calls into batches run by predict_fn in a worker thread."""
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.n_batches = 0
+        self.n_texts = 0
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        logger.info("Micro-batching: %s", self.stats())
+
+    async def predict(self, texts: list[str]) -> list:
+        """Predictions for texts, computed together with texts of concurrent calls."""
+        if not texts:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _collect(self):
+        """Waits for a first request, then for more until the batch is full or max_wait has passed."""
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        size = len(items[0][0])
+        deadline = loop.time() + self.max_wait
+        while size < self.max_batch_size:
+            if self._queue.empty():
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                item = self._queue.get_nowait()
+            items.append(item)
+            size += len(item[0])
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = await self._collect()
+            texts = [text for request_texts, _ in items for text in request_texts]
+            try:
+                predictions = await loop.run_in_executor(None, self.predict_fn, texts)
+            except Exception as e:
+                logger.exception("Batch of %s texts failed", len(texts))
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.n_batches += 1
+            self.n_texts += len(texts)
+            offset = 0
+            for request_texts, future in items:
+                if not future.done():  # the client may have gone away
+                    future.set_result(predictions[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def stats(self):
+        return {
+            "batches": self.n_batches,
+            "texts": self.n_texts,
+            "mean_batch_size": round(self.n_texts / self.n_batches, 2) if self.n_batches else 0.0,
+        }
+
+
+class InferenceService:
+    """Per-process model and batcher, started and stopped with the application."""
+
+    def __init__(self, model_path=MODEL_PATH, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.model_path = model_path
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.model = None
+        self.batcher = None
+
+    def _predict(self, texts):
+        return self.model.predict(texts).tolist()
+
+    async def start(self):
+        self.model = load_model(self.model_path)
+        self.batcher = MicroBatcher(self._predict, self.max_batch_size, self.max_wait_ms)
+        await self.batcher.start()
+
+    async def stop(self):
+        if self.batcher is not None:
+            await self.batcher.stop()
+
+    async def predict(self, texts: list[str]) -> list:
+        return await self.batcher.predict(texts)
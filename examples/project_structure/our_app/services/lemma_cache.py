@@ -0,0 +1,105 @@
+"""
+Memoization of lemmatized documents, keyed by a hash of (spaCy model name, text).
+
+An in-memory LRU serves repeated transforms within a process (cross-validation folds and grid search
+candidates see the same documents again and again), an optional SQLite file shares lemmas between
+processes (GridSearchCV n_jobs > 1) and runs.
+
+Caches are process-wide, looked up with get_lemma_cache(), never pickled with an estimator.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+COMMIT_EVERY = 1000
+
+
+def lemma_key(model_name, text):
+    return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+
+class LemmaCache:
+    def __init__(self, max_entries=100_000, path=None):
+        self.max_entries = max_entries
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._uncommitted = 0
+        self.pid = os.getpid()
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS lemmas (key BLOB PRIMARY KEY, lemmas TEXT)")
+
+    def get(self, key):
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT lemmas FROM lemmas WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = row[0]
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO lemmas VALUES (?, ?)", (key, value))
+                self._uncommitted += 1
+                if self._uncommitted >= COMMIT_EVERY:
+                    self._commit()
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        if self._db is not None and self._uncommitted:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def _remember(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "in_memory": len(self._memory),
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_lemma_cache(max_entries=100_000, path=None):
+    """Process-wide cache for the given disk path (None = memory only)."""
+    key = str(Path(path).resolve()) if path else None
+    with _caches_lock:
+        cache = _caches.get(key)
+        # A SQLite connection must not be shared with a forked child, it opens its own
+        if cache is None or cache.pid != os.getpid():
+            cache = _caches[key] = LemmaCache(max_entries, path)
+        cache.max_entries = max(cache.max_entries, max_entries)
+        return cache
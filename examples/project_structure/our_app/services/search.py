@@ -1,3 +1,6 @@
+import sys
+from pathlib import Path
+
 import numpy as np
 from sklearn.datasets import fetch_20newsgroups
 from sklearn.model_selection import train_test_split
@@ -5,8 +8,11 @@ from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.metrics import classification_report
 from collections import Counter
 
+from services.embedding_cache import CachedRows, EmbeddingCache, text_digest
+from services.vector_index import create_index
 
-from sentence_transformers import SentenceTransformer
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_CACHE_DIR = Path(__file__).parent.parent / "data" / "embeddings"
 
 
 def majority_vote(labels):
@@ -14,27 +20,106 @@ def majority_vote(labels):
     return Counter(labels).most_common(1)[0][0]
 
 
-def embed_texts(model, texts):
-    """Convert texts to embeddings using the provided model."""
-    return model.encode(texts)
+def embed_texts(model, texts, cache=None, batch_size=64, lazy=False):
+    """Convert texts to embeddings using the provided model.
 
+    With an EmbeddingCache, only texts missing in the cache are encoded (in batches) and stored.
+    With lazy=True as well, the embeddings are returned as CachedRows, read from the cache file when indexed.
+    """
+    if cache is None:
+        return model.encode(texts, batch_size=batch_size)
+    digests = [text_digest(t) for t in texts]
+    rows = cache.lookup(digests)
+    missing = np.flatnonzero(rows < 0)
+    cache.hits += len(texts) - len(missing)
+    cache.misses += len(missing)
+    if len(missing):
+        unique = list({digests[i]: i for i in missing}.values())
+        cache.add([digests[i] for i in unique], model.encode([texts[i] for i in unique], batch_size=batch_size))
+        rows = cache.lookup(digests)
+    return CachedRows(cache, rows) if lazy else cache.get(rows)
 
-def find_top_k_embeddings(test_embedding, train_embeddings, k=5):
-    """Find indices of top k embeddings most similar to the test embedding."""
-    similarities = cosine_similarity([test_embedding], train_embeddings)[0]
-    return np.argsort(similarities)[-k:]
+
+def normalize_embeddings(embeddings):
+    """L2-normalize embeddings (float32), so that a dot product equals cosine similarity."""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, np.finfo(np.float32).tiny)
 
 
-def predict_label(test_embedding, train_embeddings, train_labels, k=5):
-    """Predict label for a single test embedding."""
-    top_indices = find_top_k_embeddings(test_embedding, train_embeddings, k)
+def find_top_k_embeddings(test_embedding, train_embeddings, k=5):
+    """Find indices of top k embeddings most similar to the test embedding, most similar first."""
+    similarities = cosine_similarity([test_embedding], train_embeddings)[0]
+    k = min(k, len(similarities))
+    top = np.argpartition(similarities, -k)[-k:]
+    return top[np.argsort(-similarities[top])]
+
+
+def find_top_k_batch(test_embeddings, train_embeddings, k=5, block_size=1024):
+    """Find indices of top k train embeddings for every test embedding.
+
+    Both inputs have to be normalized (see normalize_embeddings). Similarities are computed as
+    a matrix product over blocks of test embeddings, so memory is bounded by block_size * n_train.
+    Returns an array (n_test, k), most similar first.
+    """
+    k = min(k, len(train_embeddings))
+    result = np.empty((len(test_embeddings), k), dtype=np.int64)
+    for start in range(0, len(test_embeddings), block_size):
+        similarities = test_embeddings[start:start + block_size] @ train_embeddings.T
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(similarities, top, axis=1), axis=1)
+        result[start:start + block_size] = np.take_along_axis(top, order, axis=1)
+    return result
+
+
+def majority_vote_batch(top_labels, n_classes):
+    """Most common label in every row of an integer label matrix.
+
+    Ties go to the label that comes first in the row, like majority_vote (Counter.most_common keeps
+    insertion order), so with neighbours sorted most similar first both give the same predictions.
+    """
+    n_rows, k = top_labels.shape
+    rows = np.arange(n_rows)[:, None] * n_classes
+    counts = np.bincount((top_labels + rows).ravel(), minlength=n_rows * n_classes).reshape(n_rows, n_classes)
+    first = np.full((n_rows, n_classes), k)
+    for position in range(k - 1, -1, -1):
+        first[np.arange(n_rows), top_labels[:, position]] = position
+    return (counts * (k + 1) - first).argmax(axis=1)
+
+
+def predict_labels(test_embeddings, train_embeddings, train_labels, k=5, block_size=1024, index=None):
+    """Predict labels for all test embeddings at once (batched kNN with majority vote).
+
+    If an index (services.vector_index) built over train_embeddings is given, neighbours are looked up in it
+    instead of the exact brute force scan.
+    """
+    classes, label_ids = np.unique(np.asarray(train_labels), return_inverse=True)
+    if index is not None:
+        top_indices, _ = index.search(test_embeddings, k)
+    else:
+        top_indices = find_top_k_batch(
+            normalize_embeddings(test_embeddings), normalize_embeddings(train_embeddings), k, block_size
+        )
+    return classes[majority_vote_batch(label_ids[top_indices], len(classes))]
+
+
+def predict_label(test_embedding, train_embeddings, train_labels, k=5, index=None):
+    """Predict label for a single test embedding (optionally using a vector index over train_embeddings)."""
+    if index is not None:
+        top_indices = index.search([test_embedding], k)[0][0]
+    else:
+        top_indices = find_top_k_embeddings(test_embedding, train_embeddings, k)
     top_labels = train_labels[top_indices]
     return majority_vote(top_labels)
 
 
-def main():
+def load_newsgroups_embeddings(categories=('sci.space', 'comp.graphics'), lazy=False):
+    """
+    Embeddings of the 20newsgroups split used by main: (train, test, train labels, test labels, names).
+    With lazy=True, train and test embeddings are CachedRows of the on-disk embedding cache.
+    """
     # Load dataset
-    categories = ['sci.space', 'comp.graphics']
+    categories = list(categories)
     data = fetch_20newsgroups(subset='all', categories=categories,
                               remove=('headers', 'footers', 'quotes'))
 
@@ -43,22 +128,40 @@ def main():
         data.data, data.target, test_size=0.2, random_state=42
     )
 
-    # Initialize the semantic embedding model
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    # Initialize the semantic embedding model (imported here, the kNN functions do not need torch)
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(MODEL_NAME)
+    cache = EmbeddingCache(EMBEDDING_CACHE_DIR, MODEL_NAME)
 
     # Embed training and test texts
-    X_train_embeddings = embed_texts(model, X_train_texts)
-    X_test_embeddings = embed_texts(model, X_test_texts)
+    X_train_embeddings = embed_texts(model, X_train_texts, cache, lazy=lazy)
+    X_test_embeddings = embed_texts(model, X_test_texts, cache, lazy=lazy)
+    print(f"Embedding cache: {cache.hits} hits, {cache.misses} misses, {len(cache)} stored")
+    return X_train_embeddings, X_test_embeddings, y_train, y_test, data.target_names
+
+
+def main(index_kind=None):
+    """
+    Evaluate kNN on 20newsgroups, index_kind selects an approximate index ('ivf', 'hnsw'), quantized
+    vectors ('float16', 'int8', with a float32 re-rank of the best 50 candidates) or exact search.
+    """
+    X_train_embeddings, X_test_embeddings, y_train, y_test, target_names = load_newsgroups_embeddings(lazy=True)
+    X_test_embeddings = np.asarray(X_test_embeddings)
 
     # Predict labels for test data
-    y_pred = [
-        predict_label(X_test_embeddings[i], X_train_embeddings, y_train)
-        for i in range(len(X_test_embeddings))
-    ]
+    if index_kind in ('float16', 'int8'):
+        # Only the quantized vectors are held in memory, the re-rank reads its candidates from the cache file
+        index = create_index(index_kind, rerank=50).add(X_train_embeddings)
+    else:
+        X_train_embeddings = np.asarray(X_train_embeddings)
+        index = create_index(index_kind).add(X_train_embeddings) if index_kind else None
+    if index is not None:
+        print(f"Index memory: {index.nbytes / 2 ** 20:.1f} MB")
+    y_pred = predict_labels(X_test_embeddings, X_train_embeddings, y_train, index=index)
 
     # Evaluate predictions
-    print(classification_report(y_test, y_pred, target_names=data.target_names))
+    print(classification_report(y_test, y_pred, target_names=target_names))
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
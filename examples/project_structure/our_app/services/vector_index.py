@@ -0,0 +1,431 @@
+"""
+Vector indexes for cosine-similarity nearest neighbour search over embeddings.
+
+- FlatIndex: exact brute force search (blocked matrix products).
+- IVFIndex: inverted file, k-means partitions of the vectors, only n_probe nearest partitions are scanned.
+- HNSWIndex: hierarchical navigable small world graph, greedy best-first search over a layered graph.
+- QuantizedFlatIndex: exact scan over float16 (2x smaller) or int8 (4x smaller) quantized vectors, with
+  an optional float32 re-rank of the best candidates.
+
+All indexes share the same API (add, search, save, load_index) and store L2-normalized vectors (float32
+unless quantized), so that a dot product is the cosine similarity.
+"""
+import heapq
+import math
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+
+def _normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, np.finfo(np.float32).tiny)
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores in every row, best first."""
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+class VectorIndex:
+    """Common interface of all indexes."""
+
+    kind = None
+
+    def __init__(self):
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def nbytes(self):
+        """Memory of the stored vectors."""
+        return self.vectors.nbytes
+
+    def add(self, embeddings):
+        """Index embeddings, their positions (0..n-1) are the ids returned by search."""
+        raise NotImplementedError
+
+    def search(self, queries, k=5):
+        """Return (indices, similarities), both (n_queries, k), most similar first."""
+        raise NotImplementedError
+
+    def _state(self):
+        return {}
+
+    def save(self, path):
+        """Save the index to a .npz file."""
+        np.savez(path, kind=self.kind, vectors=self.vectors, **self._state())
+
+    @classmethod
+    def _from_state(cls, data):
+        index = cls()
+        index.vectors = data["vectors"]
+        return index
+
+
+class FlatIndex(VectorIndex):
+    """Exact search, memory bounded by block_size * n_vectors similarities at a time."""
+
+    kind = "flat"
+
+    def __init__(self, block_size=1024):
+        super().__init__()
+        self.block_size = block_size
+
+    def add(self, embeddings):
+        self.vectors = _normalize(embeddings)
+        return self
+
+    def search(self, queries, k=5):
+        queries = _normalize(queries)
+        k = min(k, len(self.vectors))
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), self.block_size):
+            similarities = queries[start:start + self.block_size] @ self.vectors.T
+            top = _top_k(similarities, k)
+            indices[start:start + self.block_size] = top
+            scores[start:start + self.block_size] = np.take_along_axis(similarities, top, axis=1)
+        return indices, scores
+
+
+class IVFIndex(VectorIndex):
+    """Inverted file index: vectors are partitioned by k-means, a query scans its n_probe closest partitions."""
+
+    kind = "ivf"
+
+    def __init__(self, n_lists=None, n_probe=8, seed=0):
+        super().__init__()
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids = None
+        self.list_offsets = None  # list i holds list_ids[list_offsets[i]:list_offsets[i + 1]]
+        self.list_ids = None
+
+    def add(self, embeddings):
+        self.vectors = _normalize(embeddings)
+        n_lists = self.n_lists or max(1, int(math.sqrt(len(self.vectors))))
+        kmeans = KMeans(n_clusters=n_lists, n_init=1, random_state=self.seed).fit(self.vectors)
+        self.centroids = _normalize(kmeans.cluster_centers_)
+        assignment = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self.list_ids = np.argsort(assignment, kind="stable")
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return self
+
+    def search(self, queries, k=5):
+        queries = _normalize(queries)
+        k = min(k, len(self.vectors))
+        probe_order = _top_k(queries @ self.centroids.T, len(self.centroids))
+        sizes = np.diff(self.list_offsets)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            lists = probe_order[i, :self.n_probe]
+            # Keep probing further partitions if the nearest ones hold fewer than k vectors
+            extra = self.n_probe
+            while sizes[lists].sum() < k:
+                lists = probe_order[i, :extra + 1]
+                extra += 1
+            candidates = np.concatenate([self.list_ids[self.list_offsets[j]:self.list_offsets[j + 1]] for j in lists])
+            similarities = self.vectors[candidates] @ query
+            top = _top_k(similarities[None, :], k)[0]
+            indices[i], scores[i] = candidates[top], similarities[top]
+        return indices, scores
+
+    def _state(self):
+        return {"centroids": self.centroids, "list_offsets": self.list_offsets, "list_ids": self.list_ids,
+                "params": np.array([self.n_probe, self.seed])}
+
+    @classmethod
+    def _from_state(cls, data):
+        index = super()._from_state(data)
+        index.centroids, index.list_offsets, index.list_ids = data["centroids"], data["list_offsets"], data["list_ids"]
+        index.n_probe, index.seed = (int(v) for v in data["params"])
+        index.n_lists = len(index.centroids)
+        return index
+
+
+class HNSWIndex(VectorIndex):
+    """
+    Hierarchical navigable small world graph (Malkov & Yashunin).
+
+    Every vector gets a random top layer; upper layers are sparse "express lanes", layer 0 links
+    every vector to up to m0 = 2 * m neighbours. Search descends greedily through the
+    upper layers and runs a best-first search with a candidate list of size ef on layer 0.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, m=16, ef_construction=100, ef_search=50, seed=0):
+        super().__init__()
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.layers = []  # layers[level] maps node -> list of neighbour nodes
+        self.entry_point = None
+
+    def _max_neighbours(self, level):
+        return 2 * self.m if level == 0 else self.m
+
+    def _search_layer(self, query, entry_points, ef, level):
+        """Best-first search on one layer. Returns [(similarity, node)] of the ef best nodes, best first."""
+        graph = self.layers[level]
+        visited = set(entry_points)
+        entry_scores = self.vectors[entry_points] @ query
+        candidates = [(-s, node) for s, node in zip(entry_scores.tolist(), entry_points)]  # max-heap by similarity
+        heapq.heapify(candidates)
+        best = [(s, node) for s, node in zip(entry_scores.tolist(), entry_points)]  # min-heap, worst on top
+        heapq.heapify(best)
+        while len(best) > ef:
+            heapq.heappop(best)
+
+        while candidates:
+            neg_score, node = heapq.heappop(candidates)
+            if -neg_score < best[0][0] and len(best) >= ef:
+                break
+            neighbours = [n for n in graph.get(node, ()) if n not in visited]
+            if not neighbours:
+                continue
+            visited.update(neighbours)
+            scores = (self.vectors[neighbours] @ query).tolist()
+            for score, neighbour in zip(scores, neighbours):
+                if len(best) < ef or score > best[0][0]:
+                    heapq.heappush(candidates, (-score, neighbour))
+                    heapq.heappush(best, (score, neighbour))
+                    if len(best) > ef:
+                        heapq.heappop(best)
+        return sorted(best, reverse=True)
+
+    def _select_neighbours(self, vector, candidates, limit):
+        """
+        Neighbour selection heuristic: walking candidates from the most similar, keep one only if it is
+        closer to `vector` than to all neighbours kept so far. Links then point in diverse directions,
+        which keeps separate clusters connected.
+        """
+        candidates = np.asarray(candidates)
+        order = np.argsort(-(self.vectors[candidates] @ vector))
+        selected = []
+        for node in candidates[order].tolist():
+            if len(selected) == limit:
+                break
+            candidate = self.vectors[node]
+            if not selected or np.max(self.vectors[selected] @ candidate) < candidate @ vector:
+                selected.append(node)
+        return selected
+
+    def _link(self, node, neighbours, level):
+        graph = self.layers[level]
+        graph[node] = neighbours
+        limit = self._max_neighbours(level)
+        for neighbour in neighbours:
+            links = graph.setdefault(neighbour, [])
+            links.append(node)
+            if len(links) > limit:
+                graph[neighbour] = self._select_neighbours(self.vectors[neighbour], links, limit)
+
+    def add(self, embeddings):
+        self.vectors = _normalize(embeddings)
+        rng = np.random.default_rng(self.seed)
+        level_mult = 1 / math.log(self.m)
+        levels = np.floor(-np.log(1 - rng.random(len(self.vectors))) * level_mult).astype(int)
+        self.layers = [{} for _ in range(levels.max() + 1)]
+        self.entry_point = None
+        top_level = -1
+
+        for node, node_level in enumerate(levels.tolist()):
+            if self.entry_point is None:
+                for level in range(node_level + 1):
+                    self.layers[level][node] = []
+                self.entry_point, top_level = node, node_level
+                continue
+            query = self.vectors[node]
+            entry = [self.entry_point]
+            for level in range(top_level, node_level, -1):
+                entry = [self._search_layer(query, entry, 1, level)[0][1]]
+            for level in range(min(node_level, top_level), -1, -1):
+                found = [n for _, n in self._search_layer(query, entry, self.ef_construction, level)]
+                self._link(node, self._select_neighbours(query, found, self.m), level)
+                entry = found
+            if node_level > top_level:
+                for level in range(top_level + 1, node_level + 1):
+                    self.layers[level][node] = []
+                self.entry_point, top_level = node, node_level
+        return self
+
+    def search(self, queries, k=5):
+        queries = _normalize(queries)
+        k = min(k, len(self.vectors))
+        ef = max(self.ef_search, k)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for i, query in enumerate(queries):
+            entry = [self.entry_point]
+            for level in range(len(self.layers) - 1, 0, -1):
+                entry = [self._search_layer(query, entry, 1, level)[0][1]]
+            found = self._search_layer(query, entry, ef, 0)[:k]
+            scores[i] = [s for s, _ in found]
+            indices[i] = [n for _, n in found]
+        return indices, scores
+
+    def _state(self):
+        state = {"params": np.array([self.m, self.ef_construction, self.ef_search, self.seed, self.entry_point])}
+        for level, graph in enumerate(self.layers):
+            nodes = np.fromiter(graph.keys(), dtype=np.int64, count=len(graph))
+            state[f"layer{level}_nodes"] = nodes
+            state[f"layer{level}_offsets"] = np.concatenate([[0], np.cumsum([len(graph[n]) for n in nodes])])
+            state[f"layer{level}_links"] = np.array([l for n in nodes for l in graph[n]], dtype=np.int64)
+        return state
+
+    @classmethod
+    def _from_state(cls, data):
+        index = super()._from_state(data)
+        index.m, index.ef_construction, index.ef_search, index.seed, index.entry_point = (
+            int(v) for v in data["params"]
+        )
+        index.layers = []
+        level = 0
+        while f"layer{level}_nodes" in data:
+            nodes, offsets, links = (data[f"layer{level}_{name}"] for name in ("nodes", "offsets", "links"))
+            index.layers.append({
+                int(node): links[offsets[i]:offsets[i + 1]].tolist() for i, node in enumerate(nodes)
+            })
+            level += 1
+        return index
+
+
+class QuantizedFlatIndex(VectorIndex):
+    """
+    Exact scan over quantized vectors:
+    - float16: half precision copies of the normalized vectors
+    - int8: symmetric scalar quantization per dimension, code = round(x / scale), scale = max |x| / 127,
+      so that query . x ~= (query * scale) . code, one float multiply per dimension of the query only
+
+    Vectors are quantized and scored in blocks of block_rows, converted to float32 for the matrix product,
+    so neither add nor search needs the float32 matrix in memory. With rerank > 0 and float32 vectors
+    available (the array given to add, e.g. a np.memmap, or set_rerank_vectors after load_index), the
+    rerank best candidates of the quantized scores are scored again in full precision. The re-rank only
+    applies to searches with k < rerank, otherwise the best k of the quantized scores are returned.
+    """
+
+    kind = "quantized"
+
+    def __init__(self, dtype="int8", rerank=0, block_size=256, block_rows=16384):
+        super().__init__()
+        if dtype not in ("int8", "float16"):
+            raise ValueError(f"dtype must be 'int8' or 'float16', not {dtype!r}")
+        self.dtype = dtype
+        self.rerank = rerank
+        self.block_size = block_size
+        self.block_rows = block_rows
+        self.scales = None
+        self.rerank_vectors = None
+
+    @property
+    def nbytes(self):
+        """Memory of the quantized vectors and scales, and of the re-rank vectors unless they stay on disk."""
+        nbytes = self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+        rerank_vectors = self.rerank_vectors
+        if rerank_vectors is not None and not isinstance(rerank_vectors, np.memmap):
+            if not hasattr(rerank_vectors, "nbytes"):  # e.g. a list
+                rerank_vectors = np.asarray(rerank_vectors)
+            nbytes += rerank_vectors.nbytes
+        return nbytes
+
+    def add(self, embeddings):
+        n = len(embeddings)
+        blocks = range(0, n, self.block_rows)
+        if self.dtype == "int8":
+            max_abs = np.zeros(np.shape(embeddings)[1], dtype=np.float32)
+            for start in blocks:
+                np.maximum(max_abs, np.abs(_normalize(embeddings[start:start + self.block_rows])).max(axis=0),
+                           out=max_abs)
+            self.scales = np.maximum(max_abs, np.finfo(np.float32).tiny) / 127
+        self.vectors = np.empty((n, np.shape(embeddings)[1]), dtype=self.dtype)
+        for start in blocks:
+            block = _normalize(embeddings[start:start + self.block_rows])
+            if self.scales is not None:
+                block = np.clip(np.rint(block / self.scales), -127, 127)
+            self.vectors[start:start + self.block_rows] = block
+        self.rerank_vectors = embeddings if self.rerank else None
+        return self
+
+    def set_rerank_vectors(self, embeddings):
+        """Full precision vectors (any row-indexable array, same rows as added) for the re-rank."""
+        self.rerank_vectors = embeddings
+        return self
+
+    def search(self, queries, k=5):
+        queries = _normalize(queries)
+        k = min(k, len(self.vectors))
+        rerank = self.rerank_vectors is not None and self.rerank > k
+        n_candidates = min(self.rerank, len(self.vectors)) if rerank else k
+        scaled = queries * self.scales if self.scales is not None else queries
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        for start in range(0, len(queries), self.block_size):
+            block_queries = scaled[start:start + self.block_size]
+            # Best n_candidates of every block of vectors, then the best of those
+            found, found_scores = [], []
+            for row in range(0, len(self.vectors), self.block_rows):
+                similarities = block_queries @ self.vectors[row:row + self.block_rows].astype(np.float32).T
+                top = _top_k(similarities, n_candidates)
+                found.append(top + row)
+                found_scores.append(np.take_along_axis(similarities, top, axis=1))
+            found, found_scores = np.hstack(found), np.hstack(found_scores)
+            top = _top_k(found_scores, n_candidates)
+            candidates = np.take_along_axis(found, top, axis=1)
+            candidate_scores = np.take_along_axis(found_scores, top, axis=1)
+            if rerank:
+                rows = np.unique(candidates)
+                vectors = _normalize(self.rerank_vectors[rows])
+                exact = vectors[np.searchsorted(rows, candidates)]
+                candidate_scores = np.einsum("qcd,qd->qc", exact, queries[start:start + self.block_size])
+                top = _top_k(candidate_scores, k)
+                candidates = np.take_along_axis(candidates, top, axis=1)
+                candidate_scores = np.take_along_axis(candidate_scores, top, axis=1)
+            indices[start:start + self.block_size] = candidates[:, :k]
+            scores[start:start + self.block_size] = candidate_scores[:, :k]
+        return indices, scores
+
+    def _state(self):
+        state = {"params": np.array([self.rerank, self.block_size, self.block_rows])}
+        if self.scales is not None:
+            state["scales"] = self.scales
+        return state
+
+    @classmethod
+    def _from_state(cls, data):
+        index = super()._from_state(data)
+        index.dtype = index.vectors.dtype.name
+        index.scales = data.get("scales")
+        index.rerank, index.block_size, index.block_rows = (int(v) for v in data["params"])
+        return index
+
+
+INDEX_TYPES = {cls.kind: cls for cls in (FlatIndex, IVFIndex, HNSWIndex, QuantizedFlatIndex)}
+
+
+def create_index(kind="flat", **params):
+    """
+    Create an empty index of the given kind ('flat', 'ivf', 'hnsw' or 'quantized').
+    'int8' and 'float16' are short for a QuantizedFlatIndex with that dtype.
+    """
+    if kind in ("int8", "float16"):
+        return QuantizedFlatIndex(dtype=kind, **params)
+    return INDEX_TYPES[kind](**params)
+
+
+def load_index(path):
+    """Load an index saved with VectorIndex.save."""
+    with np.load(Path(path), allow_pickle=False) as data:
+        data = dict(data)
+    return INDEX_TYPES[str(data["kind"])]._from_state(data)
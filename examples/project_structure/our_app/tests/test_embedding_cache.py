@@ -0,0 +1,64 @@
+import numpy as np
+
+from services.embedding_cache import DIGEST_SIZE, CachedRows, EmbeddingCache, text_digest
+
+
+def make_cache(tmp_path, texts):
+    cache = EmbeddingCache(tmp_path, "model")
+    embeddings = np.arange(len(texts) * 4, dtype=np.float32).reshape(len(texts), 4)
+    cache.add([text_digest(t) for t in texts], embeddings)
+    return cache, embeddings
+
+
+def test_orphan_vector_row_is_truncated(tmp_path):
+    cache, embeddings = make_cache(tmp_path, ["a", "b"])
+    # Interrupted add: the vector row was written, its key was not
+    with open(cache.vectors_path, "ab") as f:
+        f.write(np.ones(4, dtype=np.float32).tobytes())
+
+    cache = EmbeddingCache(tmp_path, "model")
+    assert len(cache) == 2
+    assert cache.vectors_path.stat().st_size == 2 * 4 * 4
+    cache.add([text_digest("c")], np.full((1, 4), 7, dtype=np.float32))
+    rows = cache.lookup([text_digest(t) for t in "abc"])
+    np.testing.assert_array_equal(cache.get(rows), np.vstack([embeddings, np.full((1, 4), 7)]))
+
+
+def test_partial_key_is_truncated(tmp_path):
+    cache, embeddings = make_cache(tmp_path, ["a", "b"])
+    # Interrupted add: the vector row and half of its key were written
+    with open(cache.vectors_path, "ab") as f:
+        f.write(np.ones(4, dtype=np.float32).tobytes())
+    with open(cache.keys_path, "ab") as f:
+        f.write(text_digest("c")[:DIGEST_SIZE // 2])
+
+    cache = EmbeddingCache(tmp_path, "model")
+    assert len(cache) == 2
+    assert cache.keys_path.stat().st_size == 2 * DIGEST_SIZE
+    assert cache.vectors_path.stat().st_size == 2 * 4 * 4
+    cache.add([text_digest("c")], np.full((1, 4), 7, dtype=np.float32))
+    cache = EmbeddingCache(tmp_path, "model")
+    rows = cache.lookup([text_digest(t) for t in "abc"])
+    np.testing.assert_array_equal(rows, [0, 1, 2])
+    np.testing.assert_array_equal(cache.get(rows), np.vstack([embeddings, np.full((1, 4), 7)]))
+
+
+def test_torn_first_row_leaves_an_empty_cache(tmp_path):
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.meta_path.write_text('{"dim": 4, "dtype": "float32"}')
+    cache.vectors_path.write_bytes(np.ones(4, dtype=np.float32).tobytes())
+    cache.keys_path.write_bytes(text_digest("a")[:5])
+
+    cache = EmbeddingCache(tmp_path, "model")
+    assert len(cache) == 0
+    assert cache.keys_path.stat().st_size == 0
+    assert cache.vectors_path.stat().st_size == 0
+
+
+def test_cached_rows_read_from_disk(tmp_path):
+    cache, embeddings = make_cache(tmp_path, ["a", "b", "c"])
+    rows = CachedRows(cache, cache.lookup([text_digest(t) for t in "cab"]))
+    assert len(rows) == 3 and rows.shape == (3, 4)
+    np.testing.assert_array_equal(rows[1:], embeddings[[0, 1]])
+    np.testing.assert_array_equal(np.asarray(rows), embeddings[[2, 0, 1]])
+    assert rows.nbytes == 3 * 8  # only the row numbers are in memory
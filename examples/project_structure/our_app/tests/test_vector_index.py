@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from services.vector_index import FlatIndex, HNSWIndex, IVFIndex, QuantizedFlatIndex, create_index, load_index
+
+K = 10
+
+
+def clustered(n, n_clusters=20, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(42).normal(size=(n_clusters, dim))
+    return (centers[rng.integers(n_clusters, size=n)] + rng.normal(scale=0.5, size=(n, dim))).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def data():
+    train, queries = clustered(1000), clustered(100, seed=1)
+    truth, _ = FlatIndex().add(train).search(queries, K)
+    return train, queries, truth
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def test_flat_index_is_exact(data):
+    train, queries, _ = data
+    indices, scores = FlatIndex(block_size=7).add(train).search(queries, K)
+    normalized = train / np.linalg.norm(train, axis=1, keepdims=True)
+    cosine = queries @ normalized.T / np.linalg.norm(queries, axis=1, keepdims=True)
+    np.testing.assert_array_equal(indices, np.argsort(-cosine, axis=1)[:, :K])
+    np.testing.assert_allclose(scores, np.take_along_axis(cosine, indices, axis=1), rtol=1e-5)
+
+
+@pytest.mark.parametrize("index, min_recall", [
+    (IVFIndex(n_lists=16, n_probe=16), 1.0),  # every list probed: exact
+    (IVFIndex(n_lists=16, n_probe=4), 0.9),
+    (HNSWIndex(), 0.95),
+    (QuantizedFlatIndex("float16"), 0.99),
+    (QuantizedFlatIndex("int8"), 0.9),
+    (QuantizedFlatIndex("int8", rerank=50), 0.99),
+    (QuantizedFlatIndex("int8", rerank=50, block_size=16, block_rows=100), 0.99),
+], ids=["ivf all lists", "ivf", "hnsw", "float16", "int8", "int8 rerank", "int8 rerank blocks"])
+def test_recall_against_flat(data, index, min_recall):
+    train, queries, truth = data
+    found, scores = index.add(train).search(queries, K)
+    assert found.shape == scores.shape == (len(queries), K)
+    assert np.all(np.diff(scores, axis=1) <= 1e-6)  # best first
+    assert recall(found, truth) >= min_recall
+
+
+@pytest.mark.parametrize("kind", ["flat", "ivf", "hnsw", "float16", "int8"])
+def test_save_and_load(data, tmp_path, kind):
+    train, queries, _ = data
+    index = create_index(kind).add(train[:300])
+    index.save(tmp_path / "index.npz")
+    loaded = load_index(tmp_path / "index.npz")
+    np.testing.assert_array_equal(loaded.search(queries, K)[0], index.search(queries, K)[0])
+
+
+def test_k_larger_than_index(data):
+    train, queries, _ = data
+    for index in (FlatIndex(), IVFIndex(n_lists=2), QuantizedFlatIndex("int8", rerank=50)):
+        found, _ = index.add(train[:5]).search(queries[:3], K)
+        assert found.shape == (3, 5)
+        assert all(sorted(row) == list(range(5)) for row in found)
+
+
+def test_quantized_memory(data):
+    train, _, _ = data
+    int8 = QuantizedFlatIndex("int8").add(train)
+    assert int8.nbytes == train.size + train.shape[1] * 4
+    assert QuantizedFlatIndex("float16").add(train).nbytes == train.size * 2
+    # Re-rank vectors held in memory count, memory-mapped ones stay on disk
+    assert QuantizedFlatIndex("int8", rerank=50).add(train).nbytes == int8.nbytes + train.nbytes
+
+
+def test_quantized_rerank_from_disk(data, tmp_path):
+    train, queries, truth = data
+    np.save(tmp_path / "train.npy", train)
+    on_disk = np.load(tmp_path / "train.npy", mmap_mode="r")
+    index = QuantizedFlatIndex("int8", rerank=50).add(on_disk)
+    assert index.nbytes == train.size + train.shape[1] * 4
+    assert recall(index.search(queries, K)[0], truth) >= 0.99
+
+    # Loaded indexes re-rank once they are given the vectors again
+    index.save(tmp_path / "index.npz")
+    loaded = load_index(tmp_path / "index.npz").set_rerank_vectors(on_disk)
+    np.testing.assert_array_equal(loaded.search(queries, K)[0], index.search(queries, K)[0])
+
+
+def test_quantized_rerank_needs_k_below_rerank(data):
+    train, queries, _ = data
+    plain = QuantizedFlatIndex("int8").add(train).search(queries, K)[0]
+    np.testing.assert_array_equal(QuantizedFlatIndex("int8", rerank=K).add(train).search(queries, K)[0], plain)
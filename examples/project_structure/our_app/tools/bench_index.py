@@ -0,0 +1,69 @@
+"""
+Recall@k and latency of the approximate vector indexes against exact search.
+
+Usage (from our_app/): python -m tools.bench_index [n_vectors] [n_queries]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from services.vector_index import FlatIndex, IVFIndex, HNSWIndex, load_index
+
+
+def make_vectors(n, n_queries, dim=384, latent_dim=32, n_clusters=50, seed=0):
+    """
+    Clustered vectors with a low intrinsic dimension, closer to sentence embeddings than isotropic noise
+    (nearest neighbours in pure 384-d noise are barely nearer than random points).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, latent_dim))
+    projection = rng.normal(size=(latent_dim, dim))
+
+    def sample(count):
+        latent = centers[rng.integers(n_clusters, size=count)] + rng.normal(scale=0.7, size=(count, latent_dim))
+        return (latent @ projection + rng.normal(scale=0.5, size=(count, dim))).astype(np.float32)
+
+    return sample(n), sample(n_queries)
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def main(n=20000, n_queries=200, k=10):
+    data, queries = make_vectors(n, n_queries)
+    exact = FlatIndex().add(data)
+    truth, _ = exact.search(queries, k)
+
+    configs = [
+        ("flat", FlatIndex(), {}),
+        ("ivf", IVFIndex(), {"n_probe": [1, 4, 8, 16]}),
+        ("hnsw", HNSWIndex(), {"ef_search": [10, 50, 100]}),
+    ]
+    print(f"n={n} queries={n_queries} k={k}")
+    print(f"{'index':18s} {'build s':>8s} {'ms/query':>9s} {'recall@k':>9s}")
+    for name, index, sweep in configs:
+        start = time.perf_counter()
+        index.add(data)
+        build = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"{name}.npz"
+            index.save(path)
+            index = load_index(path)
+        param, values = next(iter(sweep.items()), (None, [None]))
+        for value in values:
+            if param:
+                setattr(index, param, value)
+            # single-query latency, the way a service answers one request
+            start = time.perf_counter()
+            found = np.vstack([index.search(q[None, :], k)[0] for q in queries])
+            latency = (time.perf_counter() - start) / n_queries * 1000
+            label = f"{name} {param}={value}" if param else name
+            print(f"{label:18s} {build:8.2f} {latency:9.3f} {recall(found, truth):9.3f}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,49 @@
+"""
+Lemmatization throughput (docs/s) on the 20newsgroups subset used by services/classifier.py:
+one nlp(doc) call per document versus SpacyLemmatizer streaming through nlp.pipe, and the lemma
+cache on 5-fold cross-validation (every document is transformed in 5 folds).
+
+Usage (from our_app/): python -m tools.bench_lemmatizer [n_docs]
+"""
+import sys
+import time
+
+from sklearn.datasets import fetch_20newsgroups
+from sklearn.model_selection import KFold
+
+from services.classifier import SpacyLemmatizer, load_nlp
+
+
+def main(n_docs=1000):
+    data = fetch_20newsgroups(subset='all', categories=['sci.space', 'comp.graphics'],
+                              remove=('headers', 'footers', 'quotes'))
+    docs = data.data[:n_docs]
+    nlp = load_nlp()
+    nlp('warm up')
+
+    start = time.perf_counter()
+    baseline = [' '.join(token.lemma_ for token in nlp(doc)) for doc in docs]
+    elapsed = time.perf_counter() - start
+    print(f"{'nlp(doc) per document':28s} {len(docs) / elapsed:8.1f} docs/s")
+
+    for batch_size, n_process in [(64, 1), (256, 1), (256, 2), (256, 4)]:
+        lemmatizer = SpacyLemmatizer(batch_size=batch_size, n_process=n_process, cache_size=0)
+        start = time.perf_counter()
+        result = lemmatizer.transform(docs)
+        elapsed = time.perf_counter() - start
+        assert result == baseline
+        label = f"pipe batch={batch_size} proc={n_process}"
+        print(f"{label:28s} {len(docs) / elapsed:8.1f} docs/s")
+
+    for cache_size in (0, 100_000):
+        lemmatizer = SpacyLemmatizer(cache_size=cache_size)
+        start = time.perf_counter()
+        for train_idx, _ in KFold(n_splits=5).split(docs):
+            lemmatizer.transform([docs[i] for i in train_idx])
+        elapsed = time.perf_counter() - start
+        stats = lemmatizer.cache.stats() if lemmatizer.cache else {}
+        print(f"{'5 folds cache=' + str(cache_size):28s} {elapsed:8.2f} s  {stats}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,73 @@
+"""
+Memory, throughput and accuracy of quantized embedding storage (QuantizedFlatIndex) against exact float32
+search (FlatIndex): index memory, batched search throughput, recall@k of the float32 neighbours and
+the accuracy of kNN classification (majority vote of k=5 neighbours, as in services/search.py).
+
+Train embeddings are read from disk (a memory-mapped .npy, or the embedding cache for newsgroups), so the
+MB column is what every index holds in memory; the float32 re-rank reads its candidates from disk.
+
+Usage (from our_app/):
+    python -m tools.bench_quantization [n_train] [n_test]   random embeddings (bench_search.make_embeddings)
+    python -m tools.bench_quantization newsgroups           the 20newsgroups task of services/search.py
+"""
+import sys
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from services.search import load_newsgroups_embeddings, predict_labels
+from services.vector_index import FlatIndex, QuantizedFlatIndex
+from tools.bench_search import make_embeddings
+
+CONFIGS = [
+    ("float32", lambda: FlatIndex()),
+    ("float16", lambda: QuantizedFlatIndex("float16")),
+    ("float16 rerank 50", lambda: QuantizedFlatIndex("float16", rerank=50)),
+    ("int8", lambda: QuantizedFlatIndex("int8")),
+    ("int8 rerank 50", lambda: QuantizedFlatIndex("int8", rerank=50)),
+]
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def on_disk(embeddings, directory):
+    path = Path(directory) / "train.npy"
+    np.save(path, embeddings)
+    return np.load(path, mmap_mode="r")
+
+
+def run(train, test, train_labels, test_labels, k):
+    print(f"train={len(train)} test={len(test)} dim={train.shape[1]} k={k}")
+    print(f"{'storage':18s} {'MB':>8s} {'build s':>8s} {'queries/s':>10s} {'recall@k':>9s} {'kNN accuracy':>13s}")
+    truth = None
+    for name, create in CONFIGS:
+        start = time.perf_counter()
+        index = create().add(train)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        found, _ = index.search(test, k)
+        throughput = len(test) / (time.perf_counter() - start)
+        if truth is None:
+            truth = found
+        accuracy = np.mean(predict_labels(test, train, train_labels, index=index) == test_labels)
+        print(f"{name:18s} {index.nbytes / 2 ** 20:8.1f} {build:8.2f} {throughput:10.0f} "
+              f"{recall(found, truth):9.3f} {accuracy:13.3f}")
+
+
+def main(*args, k=10):
+    with TemporaryDirectory() as directory:
+        if args and args[0] == "newsgroups":
+            train, test, train_labels, test_labels, _ = load_newsgroups_embeddings(lazy=True)
+            test = np.asarray(test, dtype=np.float32)
+        else:
+            train, train_labels, test, test_labels = make_embeddings(*(int(a) for a in args[:2] or (200_000, 1000)))
+            train = on_disk(train, directory)
+        run(train, test, train_labels, test_labels, k)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
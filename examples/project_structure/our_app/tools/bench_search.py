@@ -0,0 +1,47 @@
+"""
+Throughput of per-document kNN (predict_label) versus batched kNN (predict_labels).
+
+Uses random embeddings shaped like the 20newsgroups setup in services/search.py
+(all-MiniLM-L6-v2 has 384 dimensions, sci.space + comp.graphics is ~1970 documents split 80/20).
+
+Usage (from our_app/): python -m tools.bench_search [n_train] [n_test]
+"""
+import sys
+import time
+
+import numpy as np
+
+from services.search import predict_label, predict_labels
+
+
+def make_embeddings(n_train, n_test, dim=384, n_classes=2, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_classes, dim))
+    train_labels = rng.integers(n_classes, size=n_train)
+    test_labels = rng.integers(n_classes, size=n_test)
+    train = (centers[train_labels] + rng.normal(scale=12.0, size=(n_train, dim))).astype(np.float32)
+    test = (centers[test_labels] + rng.normal(scale=12.0, size=(n_test, dim))).astype(np.float32)
+    return train, train_labels, test, test_labels
+
+
+def main(n_train=1576, n_test=394):
+    train, train_labels, test, test_labels = make_embeddings(n_train, n_test)
+
+    start = time.perf_counter()
+    loop_pred = np.array([predict_label(t, train, train_labels) for t in test])
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_pred = predict_labels(test, train, train_labels)
+    batch_time = time.perf_counter() - start
+
+    print(f"train={n_train} test={n_test}")
+    print(f"predict_label loop: {loop_time:8.3f} s  {n_test / loop_time:12.0f} docs/s")
+    print(f"predict_labels:     {batch_time:8.3f} s  {n_test / batch_time:12.0f} docs/s"
+          f"  ({loop_time / batch_time:.0f}x)")
+    print(f"same predictions: {np.mean(loop_pred == batch_pred):.2%}, "
+          f"accuracy: {np.mean(batch_pred == test_labels):.3f}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
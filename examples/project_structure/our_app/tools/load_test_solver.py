@@ -0,0 +1,52 @@
+"""
+Load test of POST /v1/solver: concurrent clients send single-text requests, throughput and latency
+percentiles are reported.
+
+Start the server first, e.g. (from our_app/):
+    SOLVER_MAX_BATCH_SIZE=64 gunicorn main:app -w 1 -k uvicorn.workers.UvicornWorker --bind :8080
+and run SOLVER_MAX_BATCH_SIZE=1 for the unbatched baseline.
+
+Usage (from our_app/): python -m tools.load_test_solver [url] [n_requests] [concurrency]
+"""
+import asyncio
+import random
+import sys
+import time
+
+import httpx
+import numpy as np
+
+WORDS = "this is a good bad great horrible review product love hate nice awful cool meh".split()
+
+
+async def client(http, url, n_requests, latencies, rng):
+    for _ in range(n_requests):
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 30)))
+        start = time.perf_counter()
+        response = await http.post(url, json={"text": text})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url, n_requests, concurrency):
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as http:
+        await http.post(url, json={"text": "warm up"})
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client(http, url, n_requests // concurrency, latencies, random.Random(i)) for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    print(f"{len(latencies)} requests, concurrency {concurrency}")
+    print(f"throughput: {len(latencies) / elapsed:10.1f} req/s")
+    print(f"latency p50: {np.percentile(latencies, 50):8.2f} ms  p99: {np.percentile(latencies, 99):8.2f} ms")
+
+
+def main(url="http://localhost:8080/v1/solver", n_requests=5000, concurrency=64):
+    asyncio.run(run(url, int(n_requests), int(concurrency)))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
@@ -0,0 +1,127 @@
+"""
+Deterministic dataset splits that scale with the data.
+
+- split_indices / stratified_split_indices: random splits of positions 0..n-1 as NumPy index arrays,
+  the records themselves are never copied or shuffled (select them with take()).
+- hash_split / split_lines / split_file: every record goes to a split by a hash of its key (e.g. its
+  content or id), independently of all other records. One pass, constant memory, any data size, and the
+  same record always lands in the same split, also when the data grows or is processed in parallel.
+
+Fractions are normalized, (0.8, 0.2) and (4, 1) are the same split.
+"""
+import hashlib
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _boundaries(fractions: Sequence[float], n: int) -> np.ndarray:
+    fractions = np.asarray(fractions, dtype=np.float64)
+    if len(fractions) < 2 or (fractions < 0).any() or fractions.sum() <= 0:
+        raise ValueError(f"Need at least two non-negative fractions, got {list(fractions)}")
+    return np.round(np.cumsum(fractions)[:-1] / fractions.sum() * n).astype(np.int64)
+
+
+def _index_dtype(n: int):
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def split_indices(n: int, fractions: Sequence[float] = (0.8, 0.2), seed: int = 0) -> list[np.ndarray]:
+    """Disjoint random index arrays covering 0..n-1, sized by fractions (int32 while n allows it)."""
+    indices = np.arange(n, dtype=_index_dtype(n))
+    np.random.default_rng(seed).shuffle(indices)
+    return np.split(indices, _boundaries(fractions, n))
+
+
+def stratified_split_indices(labels: Sequence, fractions: Sequence[float] = (0.8, 0.2),
+                             seed: int = 0) -> list[np.ndarray]:
+    """Like split_indices, but every label is split by fractions on its own (label proportions are kept)."""
+    labels = np.asarray(labels)
+    n = len(labels)
+    rng = np.random.default_rng(seed)
+    _, counts = np.unique(labels, return_counts=True)
+    # Positions grouped by label (in the order of np.unique), then every group shuffled and cut by fractions
+    order = np.argsort(labels, kind="stable").astype(_index_dtype(n), copy=False)
+    parts = [[] for _ in range(len(fractions))]
+    start = 0
+    for count in counts:
+        group = order[start:start + count]
+        rng.shuffle(group)
+        for part, piece in zip(parts, np.split(group, _boundaries(fractions, count))):
+            part.append(piece)
+        start += count
+    splits = [np.concatenate(part) if part else np.empty(0, dtype=order.dtype) for part in parts]
+    for split in splits:
+        rng.shuffle(split)  # no label blocks in the result
+    return splits
+
+
+def take(data, indices: np.ndarray):
+    """Records of data at indices: fancy indexing for arrays, a list for other sequences."""
+    if isinstance(data, np.ndarray):
+        return data[indices]
+    return [data[i] for i in indices.tolist()]
+
+
+def _unit_interval(hashes: np.ndarray) -> np.ndarray:
+    """uint64 hashes to floats in [0, 1) (top 53 bits)."""
+    return (hashes >> np.uint64(11)).astype(np.float64) / float(2 ** 53)
+
+
+def hash_ids(ids: np.ndarray, salt: int = 0) -> np.ndarray:
+    """splitmix64 of integer ids, vectorized."""
+    with np.errstate(over="ignore"):
+        z = np.asarray(ids).astype(np.uint64) + np.uint64(salt) * SPLITMIX_GAMMA + SPLITMIX_GAMMA
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def hash_key(key: bytes, salt: str = "") -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8, key=salt.encode()).digest(), "little")
+
+
+def hash_split(ids: np.ndarray, fractions: Sequence[float] = (0.8, 0.2), salt: int = 0) -> np.ndarray:
+    """Split number of every integer id, the same id always gets the same split."""
+    cuts = np.cumsum(np.asarray(fractions, dtype=np.float64))[:-1] / np.sum(fractions)
+    return np.searchsorted(cuts, _unit_interval(hash_ids(ids, salt)), side="right").astype(np.int8)
+
+
+def split_lines(lines: Iterable[bytes], fractions: Sequence[float] = (0.8, 0.2), salt: str = "",
+                key=None) -> Iterator[tuple[int, bytes]]:
+    """(split number, line) for every line, by a hash of key(line) (the whole line by default)."""
+    cuts = (np.cumsum(np.asarray(fractions, dtype=np.float64)) / np.sum(fractions) * 2 ** 64).tolist()[:-1]
+    for line in lines:
+        value = hash_key(line if key is None else key(line), salt)
+        split = 0
+        while split < len(cuts) and value >= cuts[split]:
+            split += 1
+        yield split, line
+
+
+def split_file(path: Path, outputs: Sequence[Path], fractions: Sequence[float] = (0.8, 0.2), salt: str = "",
+               key=None, header: bool = True) -> list[int]:
+    """
+    Streams a text file into one output file per split in a single pass (the header line is copied
+    to every output). Returns the number of lines written per split.
+    """
+    if len(outputs) != len(fractions):
+        raise ValueError("Need one output per fraction")
+    counts = [0] * len(outputs)
+    files = [open(output, "wb", buffering=1024 * 1024) for output in outputs]
+    try:
+        with open(path, "rb", buffering=1024 * 1024) as f:
+            if header:
+                first_line = f.readline()
+                for out in files:
+                    out.write(first_line)
+            for split, line in split_lines(f, fractions, salt, key):
+                files[split].write(line)
+                counts[split] += 1
+    finally:
+        for out in files:
+            out.close()
+    return counts
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# The examples are flat modules importing each other (from big_file import target), so are the pipelines
+EXAMPLES = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(EXAMPLES), str(EXAMPLES / "pipelines")]
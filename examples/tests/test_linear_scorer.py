@@ -0,0 +1,77 @@
+import pickle
+import random
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.feature_selection import SelectKBest, chi2
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+
+from bench_scorer import corpus
+from linear_scorer import export_scorer
+
+
+@pytest.fixture(scope="module")
+def texts():
+    # Words outside the training vocabulary and upper case are handled like the vectorizer does
+    return corpus(300, 400), corpus(400, 100, seed=1) + ["W1 w2 W1", "", "unknown words only"]
+
+
+def fit(texts, classifier, n_classes=3, **vectorizer_params):
+    labels = [random.Random(i).randrange(n_classes) for i in range(len(texts))]
+    pipeline = Pipeline([('vectorizer', CountVectorizer(**vectorizer_params)), ('classifier', classifier)])
+    return pipeline.fit(texts, labels)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+def test_multinomial_nb_scores(texts, n_classes):
+    train, test = texts
+    pipeline = fit(train, MultinomialNB(), n_classes)
+    expected = pipeline[-1].predict_joint_log_proba(pipeline[:-1].transform(test))
+    np.testing.assert_array_equal(export_scorer(pipeline).decision_scores(test), expected)
+
+
+def test_logistic_regression_scores(texts):
+    train, test = texts
+    pipeline = fit(train, LogisticRegression(max_iter=200))
+    np.testing.assert_array_equal(export_scorer(pipeline).decision_scores(test), pipeline.decision_function(test))
+
+
+def test_binary_logistic_regression_scores(texts):
+    train, test = texts
+    pipeline = fit(train, LogisticRegression(max_iter=200), n_classes=2)
+    scores = export_scorer(pipeline).decision_scores(test)
+    # Binary decision_function is the score of classes_[1], classes_[0] scores 0
+    np.testing.assert_array_equal(scores[:, 0], 0)
+    np.testing.assert_array_equal(scores[:, 1], pipeline.decision_function(test))
+    np.testing.assert_array_equal(export_scorer(pipeline).predict(test), pipeline.predict(test))
+
+
+def test_selected_features_are_compacted(texts):
+    train, test = texts
+    labels = [random.Random(i).randrange(3) for i in range(len(train))]
+    pipeline = Pipeline([('vectorizer', CountVectorizer()), ('selector', SelectKBest(chi2, k=50)),
+                         ('classifier', LogisticRegression(max_iter=200))]).fit(train, labels)
+    scorer = export_scorer(pipeline)
+    assert len(scorer.vocabulary) == 50
+    np.testing.assert_array_equal(scorer.decision_scores(test), pipeline.decision_function(test))
+
+
+@pytest.mark.parametrize("vectorizer_params", [{'binary': True}, {'ngram_range': (1, 2)}, {'lowercase': False}])
+def test_vectorizer_settings_and_pickle(texts, vectorizer_params):
+    train, test = texts
+    pipeline = fit(train, MultinomialNB(), **vectorizer_params)
+    scorer = pickle.loads(pickle.dumps(export_scorer(pipeline)))
+    expected = pipeline[-1].predict_joint_log_proba(pipeline[:-1].transform(test))
+    np.testing.assert_array_equal(scorer.decision_scores(test), expected)
+    np.testing.assert_array_equal(scorer.predict(test), pipeline.predict(test))
+
+
+def test_unsupported_pipeline(texts):
+    train, _ = texts
+    labels = [i % 2 for i in range(len(train))]
+    pipeline = Pipeline([('vectorizer', TfidfVectorizer()), ('classifier', MultinomialNB())]).fit(train, labels)
+    with pytest.raises(ValueError):
+        export_scorer(pipeline)
@@ -0,0 +1,27 @@
+from contextlib import closing
+
+import numpy as np
+
+from log_scanner import scan
+
+
+def write_log(path, n_rows):
+    lines = ["timestamp,label,code,costs"]
+    lines += [f"2024-01-01 10:00:{i % 60:02d},label{i % 3},{i},{i}.5" for i in range(n_rows)]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_scan_reads_all_chunks(tmp_path):
+    path = write_log(tmp_path / "log.csv", 1000)
+    costs = np.concatenate([chunk["costs"] for chunk in scan(path, chunk_size=4096)])
+    np.testing.assert_array_equal(costs, np.arange(1000) + 0.5)
+
+
+def test_scan_stopped_after_first_chunk(tmp_path):
+    path = write_log(tmp_path / "log.csv", 1000)
+    with closing(scan(path, columns=("costs", "label"), chunk_size=4096)) as chunks:
+        for chunk in chunks:
+            break
+    assert 0 < len(chunk["costs"]) < 1000
+    assert chunk["label"][0] == b"label0"
@@ -0,0 +1,60 @@
+"""
+Benchmark of the inter-annotator agreement computation on synthetic annotations.
+
+Usage (from src/): python -m benchmarks.bench_agreement [n_annotations]
+"""
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tasks.agreement import load_ratings, compute_agreement
+from tasks.config import CATEGORY_FIELDS
+
+
+def make_annotations(n: int, n_users: int = 200, seed: int = 0) -> pd.DataFrame:
+    """Synthetic annotations.csv content: three annotations per submission, biased annotators."""
+    rng = np.random.default_rng(seed)
+    categories = list(CATEGORY_FIELDS)
+    leniency = rng.normal(0, 0.1, n_users)
+    rows = []
+    for i in range(n):
+        submission_id = i // 3
+        category = categories[submission_id % len(categories)]
+        user = int(rng.integers(n_users))
+        quality = ((submission_id * 2654435761) % 1000) / 1000
+        fields = {
+            f: int(rng.random() < quality + leniency[user])
+            for f in CATEGORY_FIELDS[category]
+        }
+        fields["notes"] = ""
+        rows.append({
+            "id": i + 1, "submission_id": submission_id, "category": category,
+            "fields_json": json.dumps(fields), "user": f"user{user}", "created_at": "2025-01-01T00:00:00",
+        })
+    return pd.DataFrame(rows)
+
+
+def main(n: int = 100_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "annotations.csv"
+        make_annotations(n).to_csv(path, index=False)
+
+        start = time.perf_counter()
+        ratings = load_ratings(path)
+        loaded = time.perf_counter()
+        report = compute_agreement(ratings)
+        done = time.perf_counter()
+
+    print(f"annotations: {report['total']}, ratings: {len(ratings)}")
+    print(f"load + parse: {loaded - start:.3f} s")
+    print(f"agreement:    {done - loaded:.3f} s")
+    print(f"total:        {done - start:.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
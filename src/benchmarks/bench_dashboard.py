@@ -0,0 +1,87 @@
+"""
+Render time of dashboard.html and annotate_dashboard.html with and without the fragment cache.
+
+Usage (from src/): python -m benchmarks.bench_dashboard [submissions_per_category] [annotations]
+"""
+import sys
+import time
+
+from tasks.config import CATEGORY_FIELDS
+from tasks.fragment_cache import fragment_cache
+from tasks.routers import templates as task_templates
+from tasks.annotation_routers import templates as annotation_templates
+
+
+def make_dashboard_context(n: int) -> dict:
+    text = "Once upon a time " * 40
+    submissions = {
+        "story": [{"id": i, "prompt": text, "story": text, "technology": "Gemini", "created_at": f"c{i}"}
+                  for i in range(n)],
+    }
+    for cat in ("theme", "education", "questions"):
+        submissions[cat] = [
+            {"id": i, f"{cat}_prompt": text, f"{cat}_placeholders": "{}", f"{cat}_original_story": text,
+             f"{cat}_story": text, "questions": text, "technology": "ChatGPT", "created_at": f"c{i}"}
+            for i in range(n)
+        ]
+    scores = {cat: {"score": 50.0, "max": 100, "count": 3} for cat in submissions}
+    return {
+        "request": None, "username": "student", "has_submissions": True,
+        **{f"{cat}_submissions": subs for cat, subs in submissions.items()},
+        "stats": {"total": 4 * n, **{cat: n for cat in submissions}},
+        "annotation_scores": scores,
+        "data_versions": {cat: ((1, 1),) for cat in [*submissions, "annotations"]},
+    }
+
+
+def make_annotation_context(n: int) -> dict:
+    cats = list(CATEGORY_FIELDS)
+    annotations = []
+    for i in range(n):
+        cat = cats[i % len(cats)]
+        fields = {f: i % 2 for f in CATEGORY_FIELDS[cat]}
+        fields["notes"] = "ok"
+        annotations.append({
+            "created_at": f"2025-01-01T00:00:{i}", "category": cat, "submission_id": i, "fields": fields,
+            "checked": sum(v for k, v in fields.items() if k != "notes"), "max_fields": len(CATEGORY_FIELDS[cat]),
+            "submission_json": {"id": i, "prompt": "p" * 200, "story": "s" * 1000},
+        })
+    stats = {cat: {"count": n // 4, "avg_score": 50} for cat in cats}
+    stats["total"] = n
+    return {
+        "request": None, "username": "annotator", "annotation_stats": stats, "all_annotations": annotations,
+        "data_versions": {cat: ((1, 1),) for cat in [*cats, "annotations"]},
+    }
+
+
+def timed(template, context, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        template.render(context)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench(name, template, context):
+    fragment_cache.clear()
+    fragment_cache.enabled = False
+    uncached = timed(template, context)
+    fragment_cache.enabled = True
+    start = time.perf_counter()
+    template.render(context)
+    cold = time.perf_counter() - start
+    warm = timed(template, context)
+    print(f"{name:26s} no cache {uncached * 1000:8.1f} ms | cold {cold * 1000:8.1f} ms | "
+          f"warm {warm * 1000:8.2f} ms | cache {fragment_cache.stats()}")
+
+
+def main(n_submissions: int = 500, n_annotations: int = 5000):
+    bench("dashboard.html", task_templates.get_template("dashboard.html"),
+          make_dashboard_context(n_submissions))
+    bench("annotate_dashboard.html", annotation_templates.get_template("annotate_dashboard.html"),
+          make_annotation_context(n_annotations))
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
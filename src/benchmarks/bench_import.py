@@ -0,0 +1,42 @@
+"""
+Import-time profile of tasks.main, i.e. what every gunicorn worker pays on boot without preload_app.
+
+Usage (from src/): python -m benchmarks.bench_import [runs] [top]
+"""
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+
+def profile_import(module: str = "tasks.main") -> dict[str, int]:
+    """Cumulative import time in microseconds per module, from `python -X importtime`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    result = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        result[name.strip()] = int(cumulative)
+    return result
+
+
+def main(runs: int = 5, top: int = 15):
+    samples = defaultdict(list)
+    for _ in range(runs):
+        for name, cumulative in profile_import().items():
+            samples[name].append(cumulative)
+
+    medians = {name: statistics.median(values) for name, values in samples.items()}
+    print(f"tasks.main import time (median of {runs} runs): {medians['tasks.main'] / 1000:.1f} ms")
+    print("Top-level imports by cumulative time:")
+    top_level = {name: t for name, t in medians.items() if "." not in name or name.startswith("tasks.")}
+    for name, t in sorted(top_level.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {t / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
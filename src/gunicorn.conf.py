@@ -0,0 +1,22 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from src/.
+
+Set GUNICORN_PRELOAD=1 to import the app once in the master process and warm its caches before
+forking. Workers then boot without importing anything and share the loaded modules and caches
+copy-on-write (memory is only duplicated for pages a worker writes to).
+"""
+import gc
+import os
+
+preload_app = os.environ.get("GUNICORN_PRELOAD", "0") == "1"
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+    from tasks.main import warm_caches
+
+    warm_caches()
+    # Move everything allocated so far out of the GC generations, otherwise the first collection
+    # in each worker touches (and therefore copies) every shared object
+    gc.freeze()
@@ -0,0 +1,194 @@
+"""
+Inter-annotator agreement over all annotations in annotations.csv, archived semesters included
+(see tasks.partitions).
+
+Every annotation field is a binary checkbox, so each (submission, category, field) is one "unit"
+rated by up to three annotators. All statistics are computed on a long table of unit ratings
+with groupby aggregations, no per-row Python loops except the JSON decoding.
+"""
+import json
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from tasks.annotation_helpers import ANNOTATION_CSV, data_version
+from tasks.config import CATEGORY_FIELDS
+from tasks.partitions import read_partitions
+
+logger = logging.getLogger(__name__)
+
+_cache_lock = threading.Lock()
+_cache = {"version": None, "report": None}
+
+
+def load_ratings(path=ANNOTATION_CSV) -> pd.DataFrame:
+    """
+    Read annotations.csv (all partitions, see tasks.partitions.read_partitions) into a long table of
+    binary ratings.
+    Returns:
+        DataFrame with columns: submission_id, category, field, user, value (0/1).
+    """
+    columns = ["submission_id", "category", "field", "user", "value"]
+    df = read_partitions(path, usecols=["submission_id", "category", "fields_json", "user"])
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    parsed = pd.DataFrame.from_records(
+        [json.loads(v) if isinstance(v, str) else {} for v in df["fields_json"]], index=df.index
+    )
+    frames = []
+    for cat, fields in CATEGORY_FIELDS.items():
+        mask = (df["category"] == cat).to_numpy()
+        present = [f for f in fields if f in parsed.columns]
+        if not mask.any() or not present:
+            continue
+        values = parsed.loc[mask, present].apply(pd.to_numeric, errors="coerce").fillna(0)
+        long = values.assign(
+            submission_id=df.loc[mask, "submission_id"].astype(str),
+            user=df.loc[mask, "user"].astype(str),
+        ).melt(id_vars=["submission_id", "user"], var_name="field", value_name="value")
+        long["category"] = cat
+        frames.append(long)
+    if not frames:
+        return pd.DataFrame(columns=columns)
+
+    ratings = pd.concat(frames, ignore_index=True)[columns]
+    ratings["value"] = (ratings["value"] > 0).astype(np.int8)
+    # An annotator may only rate a submission once; keep the last rating if the CSV says otherwise
+    return ratings.drop_duplicates(["submission_id", "category", "field", "user"], keep="last")
+
+
+def _unit_counts(ratings: pd.DataFrame) -> pd.DataFrame:
+    """Number of ratings (n) and positive ratings (pos) per unit, for units rated at least twice."""
+    units = ratings.groupby(["category", "submission_id", "field"], sort=False)["value"].agg(n="size", pos="sum")
+    return units[units["n"] >= 2].reset_index()
+
+
+def _fleiss_and_alpha(units: pd.DataFrame, by: list[str]) -> pd.DataFrame:
+    """
+    Fleiss' kappa (generalised to a variable number of raters per unit) and
+    Krippendorff's alpha for nominal data, both computed from per-unit counts.
+    """
+    n = units["n"].to_numpy(dtype=float)
+    pos = units["pos"].to_numpy(dtype=float)
+    neg = n - pos
+    units = units.assign(
+        # Observed pairwise agreement within the unit
+        p_unit=(pos * (pos - 1) + neg * (neg - 1)) / (n * (n - 1)),
+        # Coincidence-matrix disagreement: ordered (0, 1) pairs weighted by 1 / (m_u - 1)
+        disagree=2 * pos * neg / (n - 1),
+    )
+    g = units.groupby(by, sort=True).agg(
+        units=("n", "size"), ratings=("n", "sum"), positives=("pos", "sum"),
+        p_obs=("p_unit", "mean"), disagree=("disagree", "sum"),
+    )
+    p1 = g["positives"] / g["ratings"]
+    p_exp = p1 ** 2 + (1 - p1) ** 2
+    g["fleiss_kappa"] = (g["p_obs"] - p_exp) / (1 - p_exp)
+
+    total = g["ratings"]
+    d_obs = g["disagree"] / total
+    d_exp = 2 * g["positives"] * (total - g["positives"]) / (total * (total - 1))
+    g["krippendorff_alpha"] = 1 - d_obs / d_exp
+    g = g.replace([np.inf, -np.inf], np.nan)
+    return g[["units", "ratings", "fleiss_kappa", "krippendorff_alpha"]]
+
+
+def _annotator_pairs(ratings: pd.DataFrame) -> pd.DataFrame:
+    """All pairs of ratings of the same unit by two different annotators (each pair once)."""
+    pairs = ratings.merge(ratings, on=["category", "submission_id", "field"], suffixes=("_a", "_b"))
+    pairs = pairs[pairs["user_a"] < pairs["user_b"]]
+    return pairs.assign(agree=(pairs["value_a"] == pairs["value_b"]).astype(np.int32))
+
+
+def _cohen_pairwise(pairs: pd.DataFrame, by: list[str]) -> pd.Series:
+    """
+    Cohen's kappa for every pair of annotators sharing units, averaged per group
+    weighted by the number of shared units.
+    """
+    if pairs.empty:
+        return pd.Series(dtype=float, name="cohen_kappa")
+
+    pair_keys = by + ["user_a", "user_b"]
+    g = pairs.groupby(pair_keys, sort=False).agg(
+        n=("agree", "size"), agree=("agree", "sum"), pos_a=("value_a", "sum"), pos_b=("value_b", "sum")
+    )
+    pa = g["pos_a"] / g["n"]
+    pb = g["pos_b"] / g["n"]
+    p_obs = g["agree"] / g["n"]
+    p_exp = pa * pb + (1 - pa) * (1 - pb)
+    g["kappa"] = (p_obs - p_exp) / (1 - p_exp)
+    g = g[np.isfinite(g["kappa"])].reset_index()
+    if g.empty:
+        return pd.Series(dtype=float, name="cohen_kappa")
+
+    g["weighted"] = g["kappa"] * g["n"]
+    sums = g.groupby(by, sort=True)[["weighted", "n"]].sum()
+    return (sums["weighted"] / sums["n"]).rename("cohen_kappa")
+
+
+def _annotator_bias(ratings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per annotator leniency: how much more often the annotator ticks a criterion than the
+    other annotators of the same submission (leave-one-out mean), in percentage points.
+    """
+    keys = ["category", "submission_id", "field"]
+    grouped = ratings.groupby(keys, sort=False)["value"]
+    n = grouped.transform("size")
+    others = (grouped.transform("sum") - ratings["value"]) / (n - 1).where(n > 1)
+    diff = (ratings["value"] - others).rename("diff")
+
+    per_user = ratings.assign(diff=diff).groupby("user", sort=True)
+    result = per_user.agg(ratings=("value", "size"), positive_rate=("value", "mean"), leniency=("diff", "mean"))
+    result["compared"] = per_user["diff"].count()
+    annotations = ratings.drop_duplicates(["category", "submission_id", "user"]).groupby("user").size()
+    result["annotations"] = annotations
+    result["positive_rate"] = (result["positive_rate"] * 100).round(1)
+    result["leniency"] = (result["leniency"] * 100).round(1)
+    return result.reset_index()
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    df = df.round(3).astype(object).where(pd.notnull(df), None)
+    return df.to_dict("records")
+
+
+def compute_agreement(ratings: pd.DataFrame) -> dict:
+    """
+    Compute agreement statistics from a long ratings table (see load_ratings).
+    Returns:
+        dict with keys
+        - fields: per (category, field) agreement
+        - categories: per category agreement, all fields of the category pooled
+        - annotators: per annotator bias/leniency
+        - total: number of annotations
+    """
+    empty = {"fields": [], "categories": [], "annotators": [], "total": 0}
+    if ratings.empty:
+        return empty
+
+    total = len(ratings.drop_duplicates(["category", "submission_id", "user"]))
+    result = dict(empty, total=total, annotators=_records(_annotator_bias(ratings)))
+
+    units = _unit_counts(ratings)
+    if units.empty:
+        return result
+    pairs = _annotator_pairs(ratings)
+    for key, by in (("fields", ["category", "field"]), ("categories", ["category"])):
+        stats = _fleiss_and_alpha(units, by).join(_cohen_pairwise(pairs, by))
+        result[key] = _records(stats.reset_index())
+    return result
+
+
+def get_agreement_report() -> dict:
+    """Agreement report of all annotations, recomputed only when annotations.csv changes."""
+    version = data_version(ANNOTATION_CSV)
+    with _cache_lock:
+        if _cache["version"] == version:
+            return _cache["report"]
+        report = compute_agreement(load_ratings())
+        _cache["version"], _cache["report"] = version, report
+        logger.info("Agreement report recomputed for %s annotations", report["total"])
+        return report
@@ -0,0 +1,110 @@
+"""
+Server-Sent Events for the annotation queue.
+
+One poller per worker process watches the data files (a few os.stat calls per interval). The CSVs
+are re-read only when a file changed, and the resulting counts are fanned out to every connected
+client, so idle annotators cost no CSV scans.
+"""
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from tasks.annotation_helpers import ANNOTATION_CSV, CATEGORY_CSV, count_pending_annotations, data_version
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0       # seconds between data file checks
+KEEPALIVE_INTERVAL = 15.0  # seconds between SSE comments keeping proxies from closing the stream
+
+
+class AnnotationQueue:
+    """Shared per-process state of pending annotation counts with fan-out to subscribers."""
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self.counts: Optional[dict] = None
+        self._version = None
+        self._subscribers: set[asyncio.Queue] = set()
+        self._poller: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _current_version() -> tuple:
+        return data_version(ANNOTATION_CSV, *CATEGORY_CSV.values())
+
+    async def refresh(self) -> Optional[dict]:
+        """Recompute counts if any data file changed. Returns the event to publish, or None."""
+        async with self._lock:
+            version = self._current_version()
+            if version == self._version and self.counts is not None:
+                return None
+            counts = await run_in_threadpool(count_pending_annotations)
+            previous = self.counts
+            self.counts, self._version = counts, version
+
+        event = {"counts": counts, "new_submissions": {}}
+        if previous is not None:
+            event["new_submissions"] = {
+                cat: c["submissions"] - previous[cat]["submissions"]
+                for cat, c in counts.items()
+                if c["submissions"] > previous[cat]["submissions"]
+            }
+        return event
+
+    def publish(self, event: dict) -> None:
+        for queue in self._subscribers:
+            # Slow clients only need the latest state, drop what they have not consumed yet
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _poll(self) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                event = await self.refresh()
+            except Exception as exc:
+                logger.error("Annotation queue refresh failed: %s", exc)
+                continue
+            if event is not None:
+                self.publish(event)
+
+    async def subscribe(self, keepalive: float = KEEPALIVE_INTERVAL) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield the current counts immediately, then every change until the client disconnects.
+        Yields None when nothing happened for `keepalive` seconds.
+        """
+        event = await self.refresh()
+        if event is not None:
+            self.publish(event)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        try:
+            yield {"counts": self.counts, "new_submissions": {}}
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
+
+
+annotation_queue = AnnotationQueue()
+
+
+async def sse_stream(queue: AnnotationQueue = annotation_queue) -> AsyncIterator[str]:
+    """Format queue events as a text/event-stream."""
+    async for event in queue.subscribe():
+        if event is None:
+            yield ": keep-alive\n\n"
+            continue
+        yield f"event: counts\ndata: {json.dumps(event['counts'])}\n\n"
+        if event["new_submissions"]:
+            yield f"event: new_submissions\ndata: {json.dumps(event['new_submissions'])}\n\n"
@@ -7,13 +7,40 @@ from tasks.config import (
     DATA_DIR, STORY_GENERATOR_CSV, THEME_GENERATOR_CSV,
     EDUCATIVE_CONTENT_CSV, QUESTIONS_GENERATOR_CSV
 )
+from tasks.partitions import archived_max_id
 
 ANNOTATION_CSV = DATA_DIR / "annotations.csv"
+CATEGORY_CSV = {
+    "story": STORY_GENERATOR_CSV,
+    "theme": THEME_GENERATOR_CSV,
+    "education": EDUCATIVE_CONTENT_CSV,
+    "questions": QUESTIONS_GENERATOR_CSV,
+}
+MAX_ANNOTATIONS = 3
+
+def data_version(*paths) -> tuple:
+    """Cheap fingerprint of data files (mtime + size), changes whenever any file is rewritten."""
+    version = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+def get_data_versions() -> dict:
+    """Data version of every category CSV and of the annotations, used as template cache keys."""
+    versions = {category: data_version(csv_file) for category, csv_file in CATEGORY_CSV.items()}
+    versions["annotations"] = data_version(ANNOTATION_CSV)
+    return versions
 
 def _next_annotation_id(df: pd.DataFrame) -> int:
+    # Ids continue after the annotations already moved to the semester archive
+    archived = archived_max_id(ANNOTATION_CSV)
     if df.empty or "id" not in df.columns or df["id"].isnull().all():
-        return 1
-    return int(df["id"].dropna().astype(int).max()) + 1
+        return archived + 1
+    return max(int(df["id"].dropna().astype(int).max()), archived) + 1
 
 def save_annotation(submission_id: int, category: str, username: str, fields: dict):
     """Save a new annotation (always new, never update)."""
@@ -55,6 +82,31 @@ def already_annotated_by(submission_id: int, category: str, username: str) -> bo
     )
     return mask.any()
 
+def count_pending_annotations() -> dict:
+    """
+    Per category: number of submissions and how many of them still need annotations
+    (fewer than MAX_ANNOTATIONS). Reads every CSV once.
+    """
+    per_category = {}
+    if os.path.exists(ANNOTATION_CSV):
+        ann = pd.read_csv(ANNOTATION_CSV, usecols=["submission_id", "category"])
+        per_category = {
+            cat: group.astype(str).value_counts() for cat, group in ann.groupby("category")["submission_id"]
+        }
+    counts = {}
+    for category, csv_file in CATEGORY_CSV.items():
+        if not os.path.exists(csv_file):
+            counts[category] = {"submissions": 0, "pending": 0}
+            continue
+        ids = pd.read_csv(csv_file, usecols=["id"])["id"].dropna().astype(int).astype(str)
+        done = per_category.get(category, pd.Series(dtype=int))
+        annotated = ids.map(done).fillna(0)
+        counts[category] = {
+            "submissions": len(ids),
+            "pending": int((annotated < MAX_ANNOTATIONS).sum()),
+        }
+    return counts
+
 def get_all_submissions(category: str):
     """Return a list of all submissions for the given category from all users, with all needed fields."""
     if category == "story":
@@ -126,6 +178,7 @@ from tasks.config import (
     EDUCATIVE_CONTENT_CSV, QUESTIONS_GENERATOR_CSV
 )
 from tasks.annotation_helpers import get_all_submissions
+from tasks.partitions import read_partitions
 
 ANNOTATION_CSV = DATA_DIR / "annotations.csv"
 
@@ -147,12 +200,13 @@ def get_user_annotations(username: str):
         "education": ["education_quality", "naturalness", "correctness"],
         "questions": ["difficulty", "completeness", "correctness_of_responses"],
     }
-    if not os.path.exists(ANNOTATION_CSV):
+    # Past semesters are archived (tasks.partitions), a user's history spans all of them
+    df = read_partitions(ANNOTATION_CSV)
+    if df.empty:
         stats = {cat: {"count": 0, "avg_score": 0} for cat in category_fields}
         stats["total"] = 0
         return stats, []
 
-    df = pd.read_csv(ANNOTATION_CSV)
     user_df = df[df["user"] == username]
     stats = {}
     total = 0
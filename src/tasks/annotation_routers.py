@@ -1,20 +1,24 @@
 import random
 from typing import Optional
-from fastapi import APIRouter, Request, Depends, Form, Query
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, Request, Depends, Form, Query, HTTPException, status
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-from tasks.config import PATH
+from tasks.config import PATH, INSTRUCTORS
 from tasks.auth import get_current_user
+from tasks.agreement import get_agreement_report
+from tasks.annotation_events import sse_stream
 from tasks.annotation_helpers import (
     get_all_submissions,
     get_annotations_for_submission,
     already_annotated_by,
-    save_annotation, get_user_annotations
+    save_annotation, get_user_annotations,
+    get_data_versions
 )
+from tasks.fragment_cache import enable_fragment_cache
 
 router = APIRouter()
-templates = Jinja2Templates(directory=PATH.parent / "templates")
+templates = enable_fragment_cache(Jinja2Templates(directory=PATH.parent / "templates"))
 
 @router.get("/annotate", response_class=HTMLResponse)
 async def annotate_form(
@@ -47,6 +51,15 @@ async def annotate_form(
         },
     )
 
+@router.get("/annotate/events")
+async def annotate_events(username: str = Depends(get_current_user)):
+    """Server-Sent Events stream of per-category counts of submissions still needing annotations."""
+    return StreamingResponse(
+        sse_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/annotate")
 async def submit_annotation(
     request: Request,
@@ -115,6 +128,7 @@ async def submit_annotation(
 
 @router.get("/my-annotations", response_class=HTMLResponse)
 async def annotate_dashboard(request: Request, username: str = Depends(get_current_user)):
+    data_versions = get_data_versions()  # before reading data, so cached fragments are never newer than their key
     annotation_stats, all_annotations = get_user_annotations(username)
     return templates.TemplateResponse(
         "annotate_dashboard.html",
@@ -123,5 +137,21 @@ async def annotate_dashboard(request: Request, username: str = Depends(get_curre
             "username": username,
             "annotation_stats": annotation_stats,
             "all_annotations": all_annotations,
+            "data_versions": data_versions,
+        }
+    )
+
+
+@router.get("/agreement", response_class=HTMLResponse)
+async def agreement_dashboard(request: Request, username: str = Depends(get_current_user)):
+    """Inter-annotator agreement overview for instructors."""
+    if username not in INSTRUCTORS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Instructors only")
+    return templates.TemplateResponse(
+        "agreement.html",
+        {
+            "request": request,
+            "username": username,
+            "report": get_agreement_report(),
         }
     )
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 PATH = Path(__file__).parent
@@ -8,3 +9,14 @@ STORY_GENERATOR_CSV = DATA_DIR / "story_generator.csv"
 THEME_GENERATOR_CSV = DATA_DIR / "theme_generator.csv"
 EDUCATIVE_CONTENT_CSV = DATA_DIR / "educative_content_generator.csv"
 QUESTIONS_GENERATOR_CSV = DATA_DIR / "questions_generator.csv"
+
+# Binary annotation criteria per category (checkboxes on the /annotate form)
+CATEGORY_FIELDS = {
+    "story": ["age_appropriateness", "clarity", "creativity", "language", "message", "literature"],
+    "theme": ["theme_quality", "theme_success", "roleplaying"],
+    "education": ["education_quality", "naturalness", "correctness"],
+    "questions": ["difficulty", "completeness", "correctness_of_responses"],
+}
+
+# Comma separated usernames allowed to see instructor pages
+INSTRUCTORS = {u.strip() for u in os.environ.get("INSTRUCTORS", "").split(",") if u.strip()}
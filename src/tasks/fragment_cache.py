@@ -0,0 +1,120 @@
+"""
+Fragment cache for Jinja2 templates.
+
+Templates mark expensive parts with a cache block keyed by values that change whenever the
+fragment would render differently (user, category, data version, ...):
+
+    {% cache "story-row", username, sub.id, sub.created_at %}
+        ...
+    {% endcache %}
+
+Rendered fragments are kept in a process-wide LRU bounded by number of entries and total size.
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+FRAGMENT_CACHE_MAX_ENTRIES = 20_000
+FRAGMENT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class FragmentCache:
+    """Thread-safe LRU of rendered fragments bounded by entry count and total characters."""
+
+    def __init__(self, max_entries: int = FRAGMENT_CACHE_MAX_ENTRIES, max_bytes: int = FRAGMENT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._entries: OrderedDict[Hashable, Markup] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Markup]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Markup) -> None:
+        size = len(value)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = value
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "size": self._size, "hits": self.hits, "misses": self.misses}
+
+
+class FragmentCacheExtension(Extension):
+    """Adds the {% cache key, ... %}...{% endcache %} tag using environment.fragment_cache."""
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render_cached", [nodes.List(key_parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, key_parts: list, caller) -> Markup:
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = tuple(_hashable(part) for part in key_parts)
+        value = cache.get(key)
+        if value is None:
+            value = Markup(caller())
+            cache.set(key, value)
+        return value
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+fragment_cache = FragmentCache()
+
+
+def enable_fragment_cache(templates: Jinja2Templates, cache: FragmentCache = fragment_cache) -> Jinja2Templates:
+    """Register the cache tag on a Jinja2Templates instance, all instances share one cache by default."""
+    templates.env.add_extension(FragmentCacheExtension)
+    templates.env.fragment_cache = cache
+    return templates
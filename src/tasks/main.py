@@ -1,17 +1,36 @@
+import logging
+
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
 
 from tasks.config import PATH
-from tasks.routers import router
-from tasks.annotation_routers import router as annotation_router
+from tasks.routers import router, templates as task_templates
+from tasks.annotation_routers import router as annotation_router, templates as annotation_templates
+from tasks.agreement import get_agreement_report
+from tasks.fragment_cache import enable_fragment_cache
+
+logger = logging.getLogger(__name__)
 
 
 app = FastAPI()
 app.add_middleware(SessionMiddleware, secret_key="your-secret-key")
 app.mount("/static", StaticFiles(directory=PATH.parent / "static"), name="static")
-templates = Jinja2Templates(directory=PATH.parent / "templates")
+templates = enable_fragment_cache(Jinja2Templates(directory=PATH.parent / "templates"))
 
 app.include_router(router)
 app.include_router(annotation_router)
+
+
+def warm_caches() -> None:
+    """
+    Compile all templates and fill the data caches.
+    Called in the gunicorn master when the app is preloaded (see gunicorn.conf.py),
+    so forked workers start with warm caches shared copy-on-write.
+    """
+    for jinja in (templates, task_templates, annotation_templates):
+        for name in jinja.env.list_templates():
+            jinja.get_template(name)
+    report = get_agreement_report()
+    logger.info("Caches warmed (%s annotations)", report["total"])
@@ -0,0 +1,173 @@
+"""
+Time partitioning of the data CSVs by semester.
+
+The CSV files in DATA_DIR (STORY_GENERATOR_CSV, ..., annotations.csv) are the active partition and only
+hold rows of the current semester, so everyday reads stay small. Rows of past semesters (by created_at)
+are moved to gzip compressed files DATA_DIR/archive/<semester>/<file name>.gz, which stay readable
+through read_partitions() for exports and statistics.
+
+Semesters follow the academic calendar: "<year>-winter" runs from September to January,
+"<year>-summer" from February to August.
+
+Usage (from src/):
+    python -m tasks.partitions archive              # move past semesters out of the active files
+    python -m tasks.partitions list
+    python -m tasks.partitions export story_generator.csv out.csv [--semester 2025-winter]
+"""
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+from tasks.config import (
+    DATA_DIR, STORY_GENERATOR_CSV, THEME_GENERATOR_CSV,
+    EDUCATIVE_CONTENT_CSV, QUESTIONS_GENERATOR_CSV
+)
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+ARCHIVE_INDEX = ARCHIVE_DIR / "index.json"
+PARTITIONED_FILES = [
+    STORY_GENERATOR_CSV, THEME_GENERATOR_CSV, EDUCATIVE_CONTENT_CSV, QUESTIONS_GENERATOR_CSV,
+    DATA_DIR / "annotations.csv",
+]
+
+
+def semester_of(created_at: pd.Series) -> pd.Series:
+    """Semester name for every timestamp, NaN when the timestamp cannot be parsed."""
+    ts = pd.to_datetime(created_at, errors="coerce", format="ISO8601")
+    year, month = ts.dt.year, ts.dt.month
+    winter_year = year.where(month != 1, year - 1)
+    semester = (winter_year.astype("Int64").astype(str) + "-winter").where((month >= 9) | (month == 1))
+    return semester.fillna((year.astype("Int64").astype(str) + "-summer").where(ts.notna()))
+
+
+def current_semester(now: Optional[datetime] = None) -> str:
+    return semester_of(pd.Series([(now or datetime.now()).isoformat()])).iloc[0]
+
+
+def _load_index() -> dict:
+    if not ARCHIVE_INDEX.is_file():
+        return {}
+    return json.loads(ARCHIVE_INDEX.read_text(encoding="utf-8"))
+
+
+def _write_atomic(df: pd.DataFrame, path: Path) -> None:
+    """Write a CSV (gzip if path ends with .gz) through a temporary file, so readers never see half a file."""
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_csv(tmp, index=False, compression="gzip" if path.suffix == ".gz" else None)
+    os.replace(tmp, path)
+
+
+def archive_path(csv_file: Path, semester: str) -> Path:
+    return ARCHIVE_DIR / semester / (Path(csv_file).name + ".gz")
+
+
+def archived_semesters(csv_file: Path) -> list[str]:
+    return _load_index().get(Path(csv_file).name, {}).get("semesters", [])
+
+
+def archived_max_id(csv_file: Path) -> int:
+    """Highest id already moved to the archive, new ids continue after it."""
+    return _load_index().get(Path(csv_file).name, {}).get("max_id", 0)
+
+
+def archive_past_semesters(now: Optional[datetime] = None) -> dict[str, int]:
+    """
+    Move rows of past semesters from the active CSVs to the compressed archive.
+    Returns:
+        Number of archived rows per file name.
+    """
+    current = current_semester(now)
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    index = _load_index()
+    archived = {}
+
+    for csv_file in PARTITIONED_FILES:
+        if not csv_file.is_file():
+            continue
+        df = pd.read_csv(csv_file)
+        if df.empty or "created_at" not in df.columns:
+            continue
+        semesters = semester_of(df["created_at"])
+        past = semesters.notna() & (semesters != current)
+        if not past.any():
+            continue
+
+        entry = index.setdefault(csv_file.name, {"semesters": [], "max_id": 0})
+        for semester, rows in df[past].groupby(semesters[past]):
+            target = archive_path(csv_file, semester)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.is_file():
+                # Re-archiving (e.g. after a crash between the two writes below): keep the newest row per id
+                rows = pd.concat([pd.read_csv(target), rows], ignore_index=True)
+                rows = rows.drop_duplicates("id", keep="last")
+            _write_atomic(rows, target)
+            if semester not in entry["semesters"]:
+                entry["semesters"] = sorted(entry["semesters"] + [semester])
+        if "id" in df.columns and df.loc[past, "id"].notna().any():
+            entry["max_id"] = max(entry["max_id"], int(df.loc[past, "id"].max()))
+
+        # Index first: if we stop before rewriting the active file, rows are duplicated, never lost
+        ARCHIVE_INDEX.write_text(json.dumps(index, indent=2), encoding="utf-8")
+        _write_atomic(df[~past], csv_file)
+        archived[csv_file.name] = int(past.sum())
+        logger.info("Archived %s rows of %s", archived[csv_file.name], csv_file.name)
+    return archived
+
+
+def read_partitions(csv_file: Path, semesters: Optional[list[str]] = None, **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Read a data file across partitions: the archived semesters plus the active file.
+    Args:
+        csv_file: One of PARTITIONED_FILES.
+        semesters: Restrict to these semesters (the active file counts as current_semester()).
+            None reads everything.
+        read_csv_kwargs: Passed to pd.read_csv (e.g. usecols).
+    """
+    csv_file = Path(csv_file)
+    frames = []
+    for semester in archived_semesters(csv_file):
+        if semesters is None or semester in semesters:
+            frames.append(pd.read_csv(archive_path(csv_file, semester), **read_csv_kwargs))
+    if csv_file.is_file() and (semesters is None or current_semester() in semesters):
+        frames.append(pd.read_csv(csv_file, **read_csv_kwargs))
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    if "id" in df.columns:
+        df = df.drop_duplicates("id", keep="last")
+    return df
+
+
+def main():
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Semester partitions of the data files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("archive", help="Move rows of past semesters to the compressed archive")
+    commands.add_parser("list", help="List archived semesters per file")
+    export = commands.add_parser("export", help="Export a data file across partitions")
+    export.add_argument("name", help="Data file name, e.g. story_generator.csv")
+    export.add_argument("output", type=Path)
+    export.add_argument("--semester", action="append", help="Only these semesters (repeatable)")
+    args = parser.parse_args()
+
+    if args.command == "archive":
+        logger.info("Current semester: %s, archived: %s", current_semester(), archive_past_semesters())
+    elif args.command == "list":
+        for csv_file in PARTITIONED_FILES:
+            logger.info("%s: %s + active", csv_file.name, ", ".join(archived_semesters(csv_file)) or "-")
+    elif args.command == "export":
+        df = read_partitions(DATA_DIR / args.name, semesters=args.semester)
+        df.to_csv(args.output, index=False)
+        logger.info("Exported %s rows to %s", len(df), args.output)
+
+
+if __name__ == "__main__":
+    main()
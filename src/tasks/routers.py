@@ -7,10 +7,12 @@ from pydantic import ValidationError
 from tasks.config import PATH
 from tasks.auth import authenticate_user, get_current_user
 from tasks.task_helpers import get_user_submissions, save_submission, get_user_annotation_scores
+from tasks.annotation_helpers import get_data_versions
+from tasks.fragment_cache import enable_fragment_cache
 from tasks.models import TaskSubmission, LoginForm
 
 router = APIRouter()
-templates = Jinja2Templates(directory=PATH.parent / "templates")
+templates = enable_fragment_cache(Jinja2Templates(directory=PATH.parent / "templates"))
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -47,6 +49,7 @@ async def logout(request: Request):
 
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(request: Request, username: str = Depends(get_current_user)):
+    data_versions = get_data_versions()  # before reading data, so cached fragments are never newer than their key
     submissions = get_user_submissions(username)
     has_submissions = any(len(submissions[k]) > 0 for k in submissions)
     stats = {
@@ -69,6 +72,7 @@ async def dashboard(request: Request, username: str = Depends(get_current_user))
             "questions_submissions": submissions["questions"],
             "stats": stats,
             "annotation_scores": annotation_scores,   # <--- add this line
+            "data_versions": data_versions,
         },
     )
 
@@ -5,9 +5,9 @@ from typing import List, Dict
 from datetime import datetime
 
 import pandas as pd
-import git
 
-from tasks.annotation_helpers import get_all_submissions, ANNOTATION_CSV
+from tasks.annotation_helpers import ANNOTATION_CSV, CATEGORY_CSV
+from tasks.partitions import archived_max_id, read_partitions
 from tasks.config import (
     DATA_DIR, STORY_GENERATOR_CSV, THEME_GENERATOR_CSV,
     EDUCATIVE_CONTENT_CSV, QUESTIONS_GENERATOR_CSV
@@ -18,6 +18,9 @@ logger = logging.getLogger(__name__)
 
 def init_git_repo():
     """Initialize or return existing Git repository."""
+    # GitPython is imported lazily, it is only needed when committing and slows down worker startup
+    import git
+
     try:
         return git.Repo(DATA_DIR)
     except git.exc.InvalidGitRepositoryError:
@@ -85,10 +88,12 @@ def get_questions_generator_df() -> pd.DataFrame:
         return df
     return pd.DataFrame(columns=columns)
 
-def _next_id(df: pd.DataFrame) -> int:
+def _next_id(df: pd.DataFrame, csv_file=None) -> int:
+    # Ids continue after the rows already moved to the semester archive
+    archived = archived_max_id(csv_file) if csv_file else 0
     if df.empty or "id" not in df.columns or df["id"].isnull().all():
-        return 1
-    return int(df["id"].dropna().astype(int).max()) + 1
+        return archived + 1
+    return max(int(df["id"].dropna().astype(int).max()), archived) + 1
 
 def save_submission(
     username: str,
@@ -107,7 +112,7 @@ def save_submission(
             if category == "story":
                 df = get_story_generator_df()
                 new_row = {
-                    "id": int(submission_id) if submission_id else _next_id(df),
+                    "id": int(submission_id) if submission_id else _next_id(df, STORY_GENERATOR_CSV),
                     "prompt": data.get("prompt", ""),
                     "story": data.get("story", ""),
                     "technology": data.get("technology", ""),
@@ -128,7 +133,7 @@ def save_submission(
             elif category == "theme":
                 df = get_theme_generator_df()
                 new_row = {
-                    "id": int(submission_id) if submission_id else _next_id(df),
+                    "id": int(submission_id) if submission_id else _next_id(df, THEME_GENERATOR_CSV),
                     "prompt": data.get("theme_prompt", ""),
                     "placeholders": data.get("theme_placeholders", ""),
                     "original_story": data.get("theme_original_story", ""),
@@ -152,7 +157,7 @@ def save_submission(
             elif category == "education":
                 df = get_educative_content_df()
                 new_row = {
-                    "id": int(submission_id) if submission_id else _next_id(df),
+                    "id": int(submission_id) if submission_id else _next_id(df, EDUCATIVE_CONTENT_CSV),
                     "prompt": data.get("education_prompt", ""),
                     "placeholders": data.get("education_placeholders", ""),
                     "original_story": data.get("education_original_story", ""),
@@ -176,7 +181,7 @@ def save_submission(
             elif category == "questions":
                 df = get_questions_generator_df()
                 new_row = {
-                    "id": int(submission_id) if submission_id else _next_id(df),
+                    "id": int(submission_id) if submission_id else _next_id(df, QUESTIONS_GENERATOR_CSV),
                     "prompt": data.get("questions_prompt", ""),
                     "questions_placeholders": data.get("questions_placeholders", ""),
                     "original_story": data.get("questions_original_story", ""),
@@ -281,15 +286,16 @@ def get_user_annotation_scores(username: str):
         "education": ["education_quality", "naturalness", "correctness"],
         "questions": ["difficulty", "completeness", "correctness_of_responses"],
     }
-    if not ANNOTATION_CSV.is_file():
+    # Past semesters are archived (tasks.partitions), scores cover all of them
+    df = read_partitions(ANNOTATION_CSV)
+    if df.empty:
         return {k: {"score": 0, "max": len(v), "count": 0} for k, v in category_fields.items()}
 
-    df = pd.read_csv(ANNOTATION_CSV)
     result = {}
     for cat, fields in category_fields.items():
         # Find all this user's submissions for this category
-        subs = get_all_submissions(cat)
-        submission_ids = set(str(s["id"]) for s in subs if s["user"] == username)
+        subs = read_partitions(CATEGORY_CSV[cat])
+        submission_ids = set(subs.loc[subs["user"] == username, "id"].astype(str)) if not subs.empty else set()
         if not submission_ids:
             result[cat] = {"score": 0, "max": 100, "count": 0}
             continue
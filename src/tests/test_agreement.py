@@ -0,0 +1,78 @@
+import json
+
+import pandas as pd
+import pytest
+from sklearn.metrics import cohen_kappa_score
+
+from tasks.agreement import compute_agreement, load_ratings
+
+
+def ratings_table(values_by_user: dict[str, list[int]], field="clarity") -> pd.DataFrame:
+    return pd.DataFrame([
+        {"submission_id": str(unit), "category": "story", "field": field, "user": user, "value": value}
+        for user, values in values_by_user.items() for unit, value in enumerate(values)
+    ])
+
+
+def only(rows: list[dict]) -> dict:
+    assert len(rows) == 1
+    return rows[0]
+
+
+def test_krippendorff_reference_example():
+    # Binary data of two observers from Krippendorff, "Computing Krippendorff's Alpha-Reliability" (2011)
+    a = [0, 1, 0, 0, 0, 0, 0, 0, 1, 0]
+    b = [1, 1, 1, 0, 0, 1, 0, 0, 0, 0]
+    stats = only(compute_agreement(ratings_table({"a": a, "b": b}))["fields"])
+    assert stats["units"] == 10 and stats["ratings"] == 20
+    assert stats["krippendorff_alpha"] == pytest.approx(0.095, abs=5e-4)
+    # With two raters Fleiss' kappa is Scott's pi: (0.6 - 0.58) / (1 - 0.58)
+    assert stats["fleiss_kappa"] == pytest.approx(0.02 / 0.42, abs=5e-4)
+    assert stats["cohen_kappa"] == pytest.approx(cohen_kappa_score(a, b), abs=5e-4)
+
+
+def test_three_raters_hand_computed():
+    a, b, c = [1, 1, 0, 1], [1, 1, 0, 0], [1, 0, 0, 0]
+    stats = only(compute_agreement(ratings_table({"a": a, "b": b, "c": c}))["fields"])
+    # Mean unit agreement 2/3, chance agreement 1/2
+    assert stats["fleiss_kappa"] == pytest.approx(1 / 3, abs=5e-4)
+    # Observed disagreement 4/12, expected 2 * 6 * 6 / (12 * 11)
+    assert stats["krippendorff_alpha"] == pytest.approx(7 / 18, abs=5e-4)
+    # Pairwise kappas 0.5 (a, b), 0.2 (a, c), 0.5 (b, c), all on 4 shared units
+    pairwise = [cohen_kappa_score(x, y) for x, y in [(a, b), (a, c), (b, c)]]
+    assert pairwise == pytest.approx([0.5, 0.2, 0.5])
+    assert stats["cohen_kappa"] == pytest.approx(0.4, abs=5e-4)
+
+
+def test_perfect_agreement_and_single_ratings():
+    ratings = pd.concat([
+        ratings_table({"a": [1, 0, 1], "b": [1, 0, 1]}),
+        # Units rated only once do not count towards agreement
+        ratings_table({"a": [1, 1]}, field="language"),
+    ])
+    result = compute_agreement(ratings)
+    stats = only(result["fields"])
+    assert stats["field"] == "clarity"
+    assert stats["fleiss_kappa"] == pytest.approx(1.0)
+    assert stats["krippendorff_alpha"] == pytest.approx(1.0)
+    assert stats["cohen_kappa"] == pytest.approx(1.0)
+    assert result["total"] == 6  # annotations: (submission, annotator)
+
+
+def test_load_ratings(tmp_path):
+    path = tmp_path / "annotations.csv"
+    pd.DataFrame({
+        "id": [1, 2, 3],
+        "submission_id": [7, 7, 7],
+        "category": ["story", "story", "story"],
+        "fields_json": [json.dumps({"clarity": 1, "language": 0}), json.dumps({"clarity": "1"}),
+                        json.dumps({"clarity": 0})],
+        # bob rated twice, the last rating counts
+        "user": ["alice", "bob", "bob"],
+        "created_at": ["2025-10-01T10:00:00"] * 3,
+    }).to_csv(path, index=False)
+    ratings = load_ratings(path)
+    clarity = ratings[ratings["field"] == "clarity"].set_index("user")["value"]
+    assert clarity.to_dict() == {"alice": 1, "bob": 0}
+    assert set(ratings["field"]) == {"clarity", "language"}
+    assert load_ratings(tmp_path / "missing.csv").empty
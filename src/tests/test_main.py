@@ -0,0 +1,8 @@
+from tasks import main
+
+
+def test_warm_caches_compiles_all_templates():
+    # Templates use the {% cache %} tag, every Jinja2Templates instance needs the extension
+    main.warm_caches()
+    for jinja in (main.templates, main.task_templates, main.annotation_templates):
+        assert jinja.get_template("dashboard.html")
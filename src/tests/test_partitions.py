@@ -0,0 +1,96 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from tasks import partitions, task_helpers
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    stories, annotations = tmp_path / "story_generator.csv", tmp_path / "annotations.csv"
+    monkeypatch.setattr(partitions, "ARCHIVE_DIR", tmp_path / "archive")
+    monkeypatch.setattr(partitions, "ARCHIVE_INDEX", tmp_path / "archive" / "index.json")
+    monkeypatch.setattr(partitions, "PARTITIONED_FILES", [stories, annotations])
+    monkeypatch.setattr(task_helpers, "ANNOTATION_CSV", annotations)
+    monkeypatch.setattr(task_helpers, "CATEGORY_CSV", {"story": stories, "theme": tmp_path / "theme.csv",
+                                                       "education": tmp_path / "education.csv",
+                                                       "questions": tmp_path / "questions.csv"})
+    pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "user": ["alice", "bob", "alice", "alice"],
+        "prompt": ["p1", "p2", "p3", "p4"],
+        "created_at": ["2024-10-01T10:00:00", "2025-01-15T10:00:00", "2025-03-01T10:00:00", "2025-10-02T10:00:00"],
+    }).to_csv(stories, index=False)
+    pd.DataFrame({
+        "id": [1, 2],
+        "submission_id": [1, 4],
+        "category": ["story", "story"],
+        "fields_json": [json.dumps({"clarity": 1, "language": 1, "message": 1}), json.dumps({"clarity": 1})],
+        "user": ["bob", "bob"],
+        "created_at": ["2024-10-05T10:00:00", "2025-10-05T10:00:00"],
+    }).to_csv(annotations, index=False)
+    return tmp_path
+
+
+def test_semester_of():
+    semesters = partitions.semester_of(pd.Series([
+        "2024-09-01T00:00:00", "2025-01-31T23:59:59", "2025-02-01T00:00:00", "2025-08-31T12:00:00", "garbage"]))
+    assert semesters.iloc[:4].tolist() == ["2024-winter", "2024-winter", "2025-summer", "2025-summer"]
+    assert pd.isna(semesters.iloc[4])
+
+
+def test_archive_moves_past_semesters(data_dir):
+    archived = partitions.archive_past_semesters(now=datetime(2025, 10, 20))
+    assert archived == {"story_generator.csv": 3, "annotations.csv": 1}
+
+    stories = data_dir / "story_generator.csv"
+    assert pd.read_csv(stories)["id"].tolist() == [4]
+    assert partitions.archived_semesters(stories) == ["2024-winter", "2025-summer"]
+    assert pd.read_csv(partitions.archive_path(stories, "2024-winter"))["id"].tolist() == [1, 2]
+    assert partitions.archived_max_id(stories) == 3
+
+    # Nothing left to move
+    assert partitions.archive_past_semesters(now=datetime(2025, 10, 20)) == {}
+
+
+def test_read_partitions(data_dir, monkeypatch):
+    stories = data_dir / "story_generator.csv"
+    monkeypatch.setattr(partitions, "current_semester", lambda now=None: "2025-winter")
+    before = partitions.read_partitions(stories)
+    partitions.archive_past_semesters(now=datetime(2025, 10, 20))
+
+    after = partitions.read_partitions(stories)
+    assert sorted(after["id"]) == sorted(before["id"])
+    assert sorted(partitions.read_partitions(stories, semesters=["2024-winter"])["id"]) == [1, 2]
+    assert partitions.read_partitions(stories, semesters=["2025-winter"])["id"].tolist() == [4]
+    assert partitions.read_partitions(data_dir / "missing.csv").empty
+
+
+def test_read_partitions_prefers_the_active_row(data_dir):
+    stories = data_dir / "story_generator.csv"
+    partitions.archive_past_semesters(now=datetime(2025, 10, 20))
+    # A crash between writing the archive and rewriting the active file leaves a row in both
+    pd.DataFrame({"id": [3, 4], "user": ["alice", "alice"], "prompt": ["edited", "p4"],
+                  "created_at": ["2025-03-01T10:00:00", "2025-10-02T10:00:00"]}).to_csv(stories, index=False)
+    df = partitions.read_partitions(stories)
+    assert sorted(df["id"]) == [1, 2, 3, 4]
+    assert df.loc[df["id"] == 3, "prompt"].item() == "edited"
+
+
+def test_next_id_continues_after_archive(data_dir):
+    stories = data_dir / "story_generator.csv"
+    partitions.archive_past_semesters(now=datetime(2025, 10, 20))
+    active = pd.read_csv(stories)
+    assert task_helpers._next_id(active, stories) == 5
+    # Every row of the active file archived: ids still continue after the archived ones
+    assert task_helpers._next_id(active.iloc[:0], stories) == 4
+
+
+def test_annotation_scores_include_archived_semesters(data_dir):
+    before = task_helpers.get_user_annotation_scores("alice")
+    partitions.archive_past_semesters(now=datetime(2025, 10, 20))
+    after = task_helpers.get_user_annotation_scores("alice")
+    assert after == before
+    assert after["story"]["count"] == 2